@@ -1,10 +1,18 @@
 """
 Telegram bot command handlers for the Electricity Tracker.
+
+Handlers are I/O-bound: each update is dominated by SQLite lookups, the
+spot price HTTP fetch and the Telegram round trip, not by Python arithmetic.
+Performance work here means hiding latency (concurrency, caching, keeping
+blocking calls off the event loop) rather than speeding up the math.
 """
 
+import asyncio
 import logging
+import string
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Optional
 from zoneinfo import ZoneInfo
 
 from telegram import Update, BotCommand
@@ -16,6 +24,7 @@ from telegram.ext import (
 )
 
 from database.models import (
+    UserSettings,
     init_database,
     add_apparat,
     get_apparat,
@@ -25,49 +34,39 @@ from database.models import (
     get_active_session,
     end_session,
     cancel_session,
-    get_user_settings,
+    get_user_settings_and_appliances,
     update_user_setting,
     get_session_history,
+    get_session_totals,
     clear_sessions,
 )
+from database.settings_cache import (
+    aget_user_settings_cached,
+    prime_user_settings,
+    invalidate_user_settings,
+)
 from core.calculator import calculate_session_cost, estimate_current_cost, calculate_watt, format_duration
-from core.price_api import get_current_price, format_region_name, VALID_REGIONS, NORWAY_TZ
-from core.alerts import check_budget_alert, check_runtime_alert, get_monthly_summary
+from core.price_api import get_current_price, format_region_name, VALID_REGIONS, VALID_REGIONS_TEXT, NORWAY_TZ
+from core.alerts import check_all_alerts, check_budget_alert, get_monthly_summary, invalidate_monthly_cache
 from bot.keyboards import get_watt_mode_keyboard, get_region_keyboard, get_confirm_keyboard, get_appliance_keyboard, get_session_action_keyboard
 
 logger = logging.getLogger(__name__)
 
-# Month names in English
-MONTH_NAMES = {
-    1: "January", 2: "February", 3: "March", 4: "April",
-    5: "May", 6: "June", 7: "July", 8: "August",
-    9: "September", 10: "October", 11: "November", 12: "December"
-}
-
-
-# ============ Helper Functions ============
-
-def get_user_id(update: Update) -> int:
-    """Get user ID from update."""
-    return update.effective_user.id
-
-
-async def send_message(update: Update, text: str, **kwargs) -> None:
-    """Send a message, handling both regular updates and callback queries."""
-    if update.callback_query:
-        await update.callback_query.message.reply_text(text, parse_mode="Markdown", **kwargs)
-    else:
-        await update.message.reply_text(text, parse_mode="Markdown", **kwargs)
+# Bound once to skip the attribute lookup on datetime in hot handlers
+_now = datetime.now
+_fromiso = datetime.fromisoformat
 
+# Month names in English, indexed by month - 1
+MONTH_NAMES = (
+    "January", "February", "March", "April",
+    "May", "June", "July", "August",
+    "September", "October", "November", "December",
+)
 
-# ============ Command Handlers ============
+# Watt mode -> emoji shown next to it
+_MODE_EMOJI = {"low": "🔋", "high": "⚡", "avg": "📊"}
 
-async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle /start command - Welcome message."""
-    user_id = get_user_id(update)
-    settings = get_user_settings(user_id)  # Ensures user is created
-    
-    text = """👋 *Welcome to Electricity Tracker!*
+START_TEXT = """👋 *Welcome to Electricity Tracker!*
 
 Track your appliance energy usage and costs with real-time Norwegian spot prices.
 
@@ -84,13 +83,8 @@ Track your appliance energy usage and costs with real-time Norwegian spot prices
 Type /help for all commands.
 
 _Prices from hvakosterstrommen.no_"""
-    
-    await send_message(update, text)
-
 
-async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handle /help command - Full help with formulas."""
-    text = """📖 *Electricity Tracker Help*
+HELP_TEXT = """📖 *Electricity Tracker Help*
 
 *Appliance Commands:*
 • /add \[name] \[low] \[high] - Add appliance
@@ -124,8 +118,227 @@ Total = Spot + Fixed
 • Spot = 2.25 x 1.21 = 2.72 kr
 • Fixed = 2.25 x 1.0 = 2.25 kr
 • Total = 6.77 kr"""
+
+# Watt mode prompt shown by /use and the appliance picker
+USE_PROMPT = """⚡ *Start tracking: {name}*
+
+Select power mode:
+🔋 Low: {low}W
+⚡ High: {high}W  
+📊 Avg: {avg}W
+
+Current spot price ({region}): {price}
+Fixed cost: {fixed:.2f} kr/kWh"""
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected mid-flight
+_background_tasks: set[asyncio.Task] = set()
+
+# Seconds the appliance looked up for a /use prompt is reused by the watt mode buttons
+PENDING_USE_TTL = 60.0
+
+# Case folding that matches SQLite's NOCASE collation, which only folds ASCII letters
+_NOCASE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+# ============ Helper Functions ============
+
+def get_user_id(update: Update) -> int:
+    """Get user ID from update."""
+    return update.effective_user.id
+
+
+def _on_background_done(task: asyncio.Task) -> None:
+    """Release a finished background task and log it if it failed."""
+    _background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Background task failed: {task.exception()}")
+
+
+def run_in_background(coro) -> asyncio.Task:
+    """
+    Schedule a coroutine without waiting for it.
+    Only used for callback answers, which clear the button spinner and send no
+    message; replies are awaited so they always arrive in the order they were sent.
+    """
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_done)
+    return task
+
+
+def _parse_start(session: dict) -> datetime:
+    """Get a session's timezone-aware start time."""
+    start_time = _fromiso(session["start_time"])
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=NORWAY_TZ)
+    return start_time
+
+
+async def _get_active(user_id: int, context: ContextTypes.DEFAULT_TYPE) -> Optional[dict]:
+    """Get the user's active session, preferring the copy kept in user_data."""
+    session = context.user_data.get("active")
+    if session is None:
+        # Cache miss (e.g. after a restart) - fall back to the database
+        session = await asyncio.to_thread(get_active_session, user_id)
+        if session:
+            context.user_data["active"] = session
+    return session
+
+
+def _forget_session(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Drop the cached state of a session that was ended, cancelled or cleared."""
+    context.user_data.pop("active", None)
+
+
+async def send_message(update: Update, text: str, **kwargs) -> None:
+    """Send a message, handling both regular updates and callback queries."""
+    if update.callback_query:
+        await update.callback_query.message.reply_text(text, parse_mode="Markdown", **kwargs)
+    else:
+        await update.message.reply_text(text, parse_mode="Markdown", **kwargs)
+
+
+# ============ Shared Flows ============
+
+async def _build_use_prompt(user_id: int, name: str, context: ContextTypes.DEFAULT_TYPE) -> Optional[str]:
+    """Build the watt mode prompt for an appliance. Returns None if it doesn't exist."""
+    # The appliance lookup doesn't depend on settings, so it runs alongside the settings
+    # read; the spot price fetch starts as soon as the region is known
+    apparat_task = asyncio.create_task(asyncio.to_thread(get_apparat, user_id, name))
+    settings = await aget_user_settings_cached(user_id)
+    region = settings.region
+    price_task = asyncio.create_task(get_current_price(region))
     
-    await send_message(update, text)
+    apparat = await apparat_task
+    if not apparat:
+        price_task.cancel()
+        return None
+    
+    # Remember the appliance so the watt mode button doesn't look it up again
+    context.user_data["pending_use"] = {"apparat": apparat, "ts": time.monotonic()}
+    
+    current_price = await price_task
+    price_text = f"{current_price:.4f} kr/kWh" if current_price else "unavailable"
+    
+    avg_watt = (apparat["low_watt"] + apparat["high_watt"]) // 2
+    
+    return USE_PROMPT.format(
+        name=name,
+        low=apparat["low_watt"],
+        high=apparat["high_watt"],
+        avg=avg_watt,
+        region=region,
+        price=price_text,
+        fixed=settings.fixed_cost_nok,
+    )
+
+
+async def _finalize_session(user_id: int, session: dict) -> str:
+    """End an active session, save its costs and return the summary text."""
+    # Get user settings
+    settings = await aget_user_settings_cached(user_id)
+    region = settings.region
+    fixed_cost = settings.fixed_cost_nok
+    
+    start_time = _parse_start(session)
+    end_time = _now(NORWAY_TZ)
+    
+    # Calculate costs
+    result = await calculate_session_cost(
+        start_time, end_time,
+        session["actual_watt"],
+        fixed_cost,
+        region
+    )
+    
+    # Save session
+    await asyncio.to_thread(
+        end_session,
+        session["id"],
+        result.kwh,
+        result.spot_cost,
+        result.fixed_cost,
+        result.total_cost
+    )
+    invalidate_monthly_cache(user_id)
+    
+    # Get monthly summary
+    now = end_time
+    summary = await asyncio.to_thread(get_monthly_summary, user_id, now.year, now.month)
+    
+    mode_emoji = _MODE_EMOJI[session["watt_mode"]]
+    duration_str = format_duration(result.hours)
+    
+    text = f"""✅ *Session ended: {session['apparat_name']}*
+
+⏱ Duration: {duration_str} ({mode_emoji} {session['watt_mode']})
+⚡ Consumption: {result.kwh:.2f} kWh @ {session['actual_watt']}W
+
+💰 *Cost breakdown:*
+   Spot ({region}): {result.avg_spot_price:.2f} kr/kWh → {result.spot_cost:.2f} kr
+   Fixed: {fixed_cost:.2f} kr/kWh → {result.fixed_cost:.2f} kr
+   ─────────────────────
+   *Total: {result.total_cost:.2f} kr*
+
+📊 *{MONTH_NAMES[now.month - 1]} total:* {summary['total_kwh']:.2f} kWh / {summary['total_cost']:.2f} kr ({summary['session_count']} sessions)"""
+    
+    # Add budget info if set
+    if summary["budget"]:
+        text += f"\n💼 Budget: {summary['remaining']:.2f} kr remaining of {summary['budget']:.2f} kr"
+    
+    return text
+
+
+async def _format_status(user_id: int, session: dict, settings: Optional[UserSettings] = None) -> str:
+    """Estimate the running cost of an active session and return the status text."""
+    # Get user settings
+    if settings is None:
+        settings = await aget_user_settings_cached(user_id)
+    region = settings.region
+    fixed_cost = settings.fixed_cost_nok
+    
+    start_time = _parse_start(session)
+    
+    # Estimate current cost
+    result = await estimate_current_cost(
+        start_time,
+        session["actual_watt"],
+        fixed_cost,
+        region
+    )
+    
+    mode_emoji = _MODE_EMOJI[session["watt_mode"]]
+    duration_str = format_duration(result.hours)
+    
+    return f"""📊 *Active Session*
+
+📟 *{session['apparat_name']}* @ {session['actual_watt']}W ({mode_emoji})
+⏱ Running: {duration_str}
+⚡ Current: {result.kwh:.3f} kWh
+
+💰 *Estimated cost so far:*
+   Spot ({region}): {result.spot_cost:.2f} kr
+   Fixed: {result.fixed_cost:.2f} kr
+   *Total: {result.total_cost:.2f} kr*
+
+Use `/stop` to end or `/cancel` to abort."""
+
+
+# ============ Command Handlers ============
+
+async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /start command - Welcome message."""
+    user_id = get_user_id(update)
+    settings = await aget_user_settings_cached(user_id)  # Ensures user is created
+    
+    # Static text - reply directly instead of going through send_message
+    await update.effective_message.reply_text(START_TEXT, parse_mode="Markdown")
+
+
+async def cmd_help(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle /help command - Full help with formulas."""
+    # Static text - reply directly instead of going through send_message
+    await update.effective_message.reply_text(HELP_TEXT, parse_mode="Markdown")
 
 
 async def cmd_add(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -151,7 +364,9 @@ async def cmd_add(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if low_watt > high_watt:
         low_watt, high_watt = high_watt, low_watt  # Swap if reversed
     
-    success = add_apparat(user_id, name, low_watt, high_watt)
+    success = await asyncio.to_thread(add_apparat, user_id, name, low_watt, high_watt)
+    # Appliances changed, so a remembered /use lookup may no longer be current
+    context.user_data.pop("pending_use", None)
     
     if success:
         avg_watt = (low_watt + high_watt) // 2
@@ -163,18 +378,17 @@ async def cmd_add(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 async def cmd_list(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /list command - Show all appliances."""
     user_id = get_user_id(update)
-    apparater = get_all_apparater(user_id)
+    apparater = await asyncio.to_thread(get_all_apparater, user_id)
     
     if not apparater:
         await send_message(update, "📋 No appliances registered.\n\nAdd one with /add \[name] \[low] \[high]")
         return
     
-    lines = ["📋 *Your Appliances:*\n"]
-    for a in apparater:
-        avg = (a["low_watt"] + a["high_watt"]) // 2
-        lines.append(f"• *{a['name']}*: {a['low_watt']}W / {a['high_watt']}W (avg {avg}W)")
-    
-    await send_message(update, "\n".join(lines))
+    body = "\n".join(
+        f"• *{a['name']}*: {a['low_watt']}W / {a['high_watt']}W (avg {(a['low_watt'] + a['high_watt']) // 2}W)"
+        for a in apparater
+    )
+    await send_message(update, "📋 *Your Appliances:*\n\n" + body)
 
 
 async def cmd_delete(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -183,7 +397,7 @@ async def cmd_delete(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     
     if not context.args:
         # Show appliances as buttons
-        apparater = get_all_apparater(user_id)
+        apparater = await asyncio.to_thread(get_all_apparater, user_id)
         if not apparater:
             await send_message(update, "📋 No appliances to delete.")
             return
@@ -192,7 +406,9 @@ async def cmd_delete(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
         return
     
     name = context.args[0]
-    success = delete_apparat(user_id, name)
+    success = await asyncio.to_thread(delete_apparat, user_id, name)
+    # Don't let a watt mode button start a session on an appliance that was just deleted
+    context.user_data.pop("pending_use", None)
     
     if success:
         await send_message(update, f"🗑️ *{name}* deleted.")
@@ -205,14 +421,14 @@ async def cmd_use(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     user_id = get_user_id(update)
     
     # Check for existing active session
-    active = get_active_session(user_id)
+    active = await _get_active(user_id, context)
     if active:
         await send_message(update, f"⚠️ Already tracking *{active['apparat_name']}*.\n\nUse `/stop` to end or `/cancel` to abort.")
         return
     
     if not context.args:
         # Show list of appliances as buttons
-        apparater = get_all_apparater(user_id)
+        apparater = await asyncio.to_thread(get_all_apparater, user_id)
         if not apparater:
             await send_message(update, "❌ No appliances registered.\n\nAdd one with /add \[name] \[low] \[high]")
             return
@@ -221,51 +437,38 @@ async def cmd_use(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         return
     
     name = context.args[0]
-    apparat = get_apparat(user_id, name)
+    text = await _build_use_prompt(user_id, name, context)
     
-    if not apparat:
+    if text is None:
         await send_message(update, f"❌ Appliance *{name}* not found.\n\nUse `/list` to see your appliances.")
         return
     
-    # Get current spot price for display
-    settings = get_user_settings(user_id)
-    region = settings.get("region", "NO1")
-    current_price = await get_current_price(region)
-    price_text = f"{current_price:.4f} kr/kWh" if current_price else "unavailable"
-    
-    avg_watt = (apparat["low_watt"] + apparat["high_watt"]) // 2
-    
-    text = f"""⚡ *Start tracking: {name}*
-
-Select power mode:
-🔋 Low: {apparat['low_watt']}W
-⚡ High: {apparat['high_watt']}W  
-📊 Avg: {avg_watt}W
-
-Current spot price ({region}): {price_text}
-Fixed cost: {settings.get('fixed_cost_nok', 1.0):.2f} kr/kWh"""
-    
     await send_message(update, text, reply_markup=get_watt_mode_keyboard(name))
 
 
 async def callback_watt_mode(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle watt mode selection callback."""
     query = update.callback_query
-    await query.answer()
+    # Clear the button spinner without holding up the handler
+    run_in_background(query.answer())
     
     user_id = get_user_id(update)
-    data = query.data.split(":")
-    
-    if len(data) != 3 or data[0] != "watt":
-        return
-    
-    mode, apparat_name = data[1], data[2]
+    _, _, rest = query.data.partition(":")
+    mode, _, apparat_name = rest.partition(":")
+    pending = context.user_data.pop("pending_use", None)
     
     if mode == "cancel":
         await query.edit_message_text("❌ Cancelled.")
         return
     
-    apparat = get_apparat(user_id, apparat_name)
+    if (
+        pending
+        and pending["apparat"]["name"].translate(_NOCASE) == apparat_name.translate(_NOCASE)
+        and time.monotonic() - pending["ts"] < PENDING_USE_TTL
+    ):
+        apparat = pending["apparat"]
+    else:
+        apparat = await asyncio.to_thread(get_apparat, user_id, apparat_name)
     if not apparat:
         await query.edit_message_text(f"❌ Appliance *{apparat_name}* not found.", parse_mode="Markdown")
         return
@@ -273,21 +476,32 @@ async def callback_watt_mode(update: Update, context: ContextTypes.DEFAULT_TYPE)
     # Calculate actual watt based on mode
     actual_watt = calculate_watt(apparat["low_watt"], apparat["high_watt"], mode)
     
-    # Start the session
-    session_id = start_session(user_id, apparat["id"], mode, actual_watt)
+    # Fetch the current spot price while the session row is written
+    settings = await aget_user_settings_cached(user_id)
+    region = settings.region
+    price_task = asyncio.create_task(get_current_price(region))
     
-    # Get current spot price
-    settings = get_user_settings(user_id)
-    region = settings.get("region", "NO1")
-    current_price = await get_current_price(region)
+    # Start the session
+    session_id, started = await asyncio.to_thread(start_session, user_id, apparat["id"], apparat["name"], mode, actual_watt)
+    # Same values as the stored row, so cached and database reads cost a session identically
+    context.user_data["active"] = {
+        "id": session_id,
+        "apparat_name": apparat["name"],
+        "watt_mode": mode,
+        "actual_watt": actual_watt,
+        "start_time": started.isoformat(),
+        "start_ts": int(started.timestamp()),
+    }
+    
+    current_price = await price_task
     price_text = f"{current_price:.4f} kr/kWh" if current_price else "fetching..."
     
-    mode_emoji = {"low": "🔋", "high": "⚡", "avg": "📊"}[mode]
+    mode_emoji = _MODE_EMOJI[mode]
     
     text = f"""✅ *Session started!*
 
 📟 *{apparat_name}* @ {actual_watt}W ({mode_emoji} {mode})
-⏱ Started: {datetime.now(NORWAY_TZ).strftime('%H:%M')}
+⏱ Started: {started.strftime('%H:%M')}
 💡 Spot price ({region}): {price_text}"""
     
     await query.edit_message_text(text, parse_mode="Markdown", reply_markup=get_session_action_keyboard())
@@ -296,68 +510,20 @@ async def callback_watt_mode(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def cmd_stop(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /stop command - End session and calculate costs."""
     user_id = get_user_id(update)
-    session = get_active_session(user_id)
+    session = await _get_active(user_id, context)
     
     if not session:
         await send_message(update, "❌ No active session.\n\nStart one with `/use [appliance]`")
         return
     
-    # Get user settings
-    settings = get_user_settings(user_id)
-    region = settings.get("region", "NO1")
-    fixed_cost = settings.get("fixed_cost_nok", 1.0)
-    
-    # Parse start time
-    start_time = datetime.fromisoformat(session["start_time"])
-    if start_time.tzinfo is None:
-        start_time = start_time.replace(tzinfo=NORWAY_TZ)
-    end_time = datetime.now(NORWAY_TZ)
-    
-    # Calculate costs
-    result = await calculate_session_cost(
-        start_time, end_time,
-        session["actual_watt"],
-        fixed_cost,
-        region
-    )
-    
-    # Save session
-    end_session(
-        session["id"],
-        result["kwh"],
-        result["spot_cost"],
-        result["fixed_cost"],
-        result["total_cost"]
-    )
-    
-    # Get monthly summary
-    now = datetime.now(NORWAY_TZ)
-    summary = get_monthly_summary(user_id, now.year, now.month)
-    
-    mode_emoji = {"low": "🔋", "high": "⚡", "avg": "📊"}[session["watt_mode"]]
-    duration_str = format_duration(result["hours"])
-    
-    text = f"""✅ *Session ended: {session['apparat_name']}*
-
-⏱ Duration: {duration_str} ({mode_emoji} {session['watt_mode']})
-⚡ Consumption: {result['kwh']:.2f} kWh @ {session['actual_watt']}W
-
-💰 *Cost breakdown:*
-   Spot ({region}): {result['avg_spot_price']:.2f} kr/kWh → {result['spot_cost']:.2f} kr
-   Fixed: {fixed_cost:.2f} kr/kWh → {result['fixed_cost']:.2f} kr
-   ─────────────────────
-   *Total: {result['total_cost']:.2f} kr*
-
-📊 *{MONTH_NAMES[now.month]} total:* {summary['total_kwh']:.2f} kWh / {summary['total_cost']:.2f} kr ({summary['session_count']} sessions)"""
-    
-    # Add budget info if set
-    if summary["budget"]:
-        text += f"\n💼 Budget: {summary['remaining']:.2f} kr remaining of {summary['budget']:.2f} kr"
+    text = await _finalize_session(user_id, session)
+    _forget_session(context)
     
+    # Check for budget alert while the summary is being sent
+    alert_task = asyncio.create_task(check_budget_alert(user_id))
     await send_message(update, text)
     
-    # Check for budget alert
-    alert = await check_budget_alert(user_id)
+    alert = await alert_task
     if alert:
         await send_message(update, alert)
 
@@ -365,19 +531,16 @@ async def cmd_stop(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 async def cmd_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /cancel command - Cancel session without recording."""
     user_id = get_user_id(update)
-    session = get_active_session(user_id)
+    session = await _get_active(user_id, context)
     
     if not session:
         await send_message(update, "❌ No active session to cancel.")
         return
     
-    cancel_session(session["id"])
+    await asyncio.to_thread(cancel_session, session["id"])
     
-    start_time = datetime.fromisoformat(session["start_time"])
-    if start_time.tzinfo is None:
-        start_time = start_time.replace(tzinfo=NORWAY_TZ)
-    duration = datetime.now(NORWAY_TZ) - start_time
-    hours = duration.total_seconds() / 3600
+    hours = (time.time() - session["start_ts"]) / 3600
+    _forget_session(context)
     
     await send_message(update, f"🚫 *Session cancelled*\n\n{session['apparat_name']} ({format_duration(hours)}) - not recorded.")
 
@@ -385,58 +548,30 @@ async def cmd_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
 async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /status command - Show current session status."""
     user_id = get_user_id(update)
-    session = get_active_session(user_id)
+    session = await _get_active(user_id, context)
     
     if not session:
         await send_message(update, "📊 No active session.\n\nStart one with `/use [appliance]`")
         return
     
-    # Get user settings
-    settings = get_user_settings(user_id)
-    region = settings.get("region", "NO1")
-    fixed_cost = settings.get("fixed_cost_nok", 1.0)
-    
-    # Parse start time
-    start_time = datetime.fromisoformat(session["start_time"])
-    if start_time.tzinfo is None:
-        start_time = start_time.replace(tzinfo=NORWAY_TZ)
+    settings = await aget_user_settings_cached(user_id)
+    text = await _format_status(user_id, session, settings)
     
-    # Estimate current cost
-    result = await estimate_current_cost(
-        start_time,
-        session["actual_watt"],
-        fixed_cost,
-        region
+    # Run the session alerts while the status is being sent, reusing the session and settings.
+    # The budget alert stays on /stop, so /status doesn't repeat it on every call.
+    alerts_task = asyncio.create_task(
+        check_all_alerts(user_id, session=session, settings=settings, include_budget=False)
     )
-    
-    mode_emoji = {"low": "🔋", "high": "⚡", "avg": "📊"}[session["watt_mode"]]
-    duration_str = format_duration(result["hours"])
-    
-    text = f"""📊 *Active Session*
-
-📟 *{session['apparat_name']}* @ {session['actual_watt']}W ({mode_emoji})
-⏱ Running: {duration_str}
-⚡ Current: {result['kwh']:.3f} kWh
-
-💰 *Estimated cost so far:*
-   Spot ({region}): {result['spot_cost']:.2f} kr
-   Fixed: {result['fixed_cost']:.2f} kr
-   *Total: {result['total_cost']:.2f} kr*
-
-Use `/stop` to end or `/cancel` to abort."""
-    
     await send_message(update, text)
     
-    # Check for runtime alert
-    alert = await check_runtime_alert(user_id)
-    if alert:
+    for alert in await alerts_task:
         await send_message(update, alert)
 
 
 async def cmd_mnd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /mnd command - Show monthly summary. Optional: /mnd [month] or /mnd [month] [year]"""
     user_id = get_user_id(update)
-    now = datetime.now(NORWAY_TZ)
+    now = _now(NORWAY_TZ)
     
     # Parse optional month/year arguments
     year = now.year
@@ -454,12 +589,12 @@ async def cmd_mnd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
             await send_message(update, "❌ Usage: /mnd or /mnd \\[month] or /mnd \\[month] \\[year]\\n\\nExample: /mnd 2 (February) or /mnd 12 2025")
             return
     
-    summary = get_monthly_summary(user_id, year, month)
+    summary = await asyncio.to_thread(get_monthly_summary, user_id, year, month)
     region_name = format_region_name(summary["region"])
     
     # Show if viewing past month
     is_current = (year == now.year and month == now.month)
-    month_label = f"{MONTH_NAMES[month]} {year}" + (" *(current)*" if is_current else "")
+    month_label = f"{MONTH_NAMES[month - 1]} {year}" + (" *(current)*" if is_current else "")
     
     text = f"""📅 *{month_label}* ({summary['region']} - {region_name})
 
@@ -482,20 +617,17 @@ async def cmd_mnd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 async def cmd_history(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /history command - Show recent sessions."""
     user_id = get_user_id(update)
-    sessions = get_session_history(user_id, limit=10)
+    sessions = await asyncio.to_thread(get_session_history, user_id, limit=10)
     
     if not sessions:
         await send_message(update, "📜 No session history yet.\n\nStart tracking with `/use [appliance]`")
         return
     
-    lines = ["📜 *Recent Sessions:*\n"]
-    
-    for s in sessions:
-        end_time = datetime.fromisoformat(s["end_time"])
-        date_str = end_time.strftime("%d/%m %H:%M")
-        lines.append(f"• {date_str} - *{s['apparat_name']}*: {s['kwh']:.2f} kWh, {s['total_cost_nok']:.2f} kr")
-    
-    await send_message(update, "\n".join(lines))
+    body = "\n".join(
+        f"• {_fromiso(s['end_time']):%d/%m %H:%M} - *{s['apparat_name']}*: {s['kwh']:.2f} kWh, {s['total_cost_nok']:.2f} kr"
+        for s in sessions
+    )
+    await send_message(update, "📜 *Recent Sessions:*\n\n" + body)
 
 
 async def cmd_budget(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -503,10 +635,10 @@ async def cmd_budget(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
     user_id = get_user_id(update)
     
     if not context.args:
-        settings = get_user_settings(user_id)
-        budget = settings.get("budget_nok")
+        settings = await aget_user_settings_cached(user_id)
+        budget = settings.budget_nok
         if budget:
-            summary = get_monthly_summary(user_id)
+            summary = await asyncio.to_thread(get_monthly_summary, user_id)
             await send_message(update, f"💼 *Budget:* {budget:.2f} kr\n\nRemaining: {summary['remaining']:.2f} kr\n\nSet new budget: `/budget [kr]`")
         else:
             await send_message(update, "💼 No budget set.\n\nSet one: `/budget [kr]`")
@@ -519,10 +651,12 @@ async def cmd_budget(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
         return
     
     if budget <= 0:
-        update_user_setting(user_id, budget_nok=None)
+        await asyncio.to_thread(update_user_setting, user_id, budget_nok=None)
+        invalidate_user_settings(user_id)
         await send_message(update, "💼 Budget disabled.")
     else:
-        update_user_setting(user_id, budget_nok=budget)
+        await asyncio.to_thread(update_user_setting, user_id, budget_nok=budget)
+        invalidate_user_settings(user_id)
         await send_message(update, f"✅ Budget set to *{budget:.2f} kr* per month.")
 
 
@@ -531,8 +665,8 @@ async def cmd_set_fastkost(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     user_id = get_user_id(update)
     
     if not context.args:
-        settings = get_user_settings(user_id)
-        fixed = settings.get("fixed_cost_nok", 1.0)
+        settings = await aget_user_settings_cached(user_id)
+        fixed = settings.fixed_cost_nok
         await send_message(update, f"⚙️ *Fixed cost:* {fixed:.2f} kr/kWh\n\n(Includes nettleie, avgifter, MVA)\n\nChange: `/set_fastkost [kr]`")
         return
     
@@ -546,7 +680,9 @@ async def cmd_set_fastkost(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         await send_message(update, "❌ Cost cannot be negative.")
         return
     
-    update_user_setting(user_id, fixed_cost_nok=cost)
+    await asyncio.to_thread(update_user_setting, user_id, fixed_cost_nok=cost)
+    
+    invalidate_user_settings(user_id)
     await send_message(update, f"✅ Fixed cost set to *{cost:.2f} kr/kWh*\n\n⚠️ _Adjust this based on your electricity bill (nettleie + avgifter + MVA)_")
 
 
@@ -555,33 +691,33 @@ async def cmd_set_region(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     user_id = get_user_id(update)
     
     if not context.args:
-        settings = get_user_settings(user_id)
-        current = settings.get("region", "NO1")
+        settings = await aget_user_settings_cached(user_id)
+        current = settings.region
         await send_message(update, f"🗺️ Current region: *{current}* ({format_region_name(current)})\n\nChange region:", reply_markup=get_region_keyboard())
         return
     
     region = context.args[0].upper()
     if region not in VALID_REGIONS:
-        await send_message(update, f"❌ Invalid region. Choose: {', '.join(sorted(VALID_REGIONS))}")
+        await send_message(update, f"❌ Invalid region. Choose: {VALID_REGIONS_TEXT}")
         return
     
-    update_user_setting(user_id, region=region)
+    await asyncio.to_thread(update_user_setting, user_id, region=region)
+    
+    invalidate_user_settings(user_id)
     await send_message(update, f"✅ Region set to *{region}* ({format_region_name(region)})")
 
 
 async def callback_region(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle region selection callback."""
     query = update.callback_query
-    await query.answer()
+    # Clear the button spinner without holding up the handler
+    run_in_background(query.answer())
     
     user_id = get_user_id(update)
-    data = query.data.split(":")
-    
-    if len(data) != 2 or data[0] != "region":
-        return
+    _, _, region = query.data.partition(":")
     
-    region = data[1]
-    update_user_setting(user_id, region=region)
+    await asyncio.to_thread(update_user_setting, user_id, region=region)
+    invalidate_user_settings(user_id)
     
     await query.edit_message_text(f"✅ Region set to *{region}* ({format_region_name(region)})", parse_mode="Markdown")
 
@@ -591,8 +727,8 @@ async def cmd_set_periode(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     user_id = get_user_id(update)
     
     if not context.args:
-        settings = get_user_settings(user_id)
-        day = settings.get("period_start_day", 1)
+        settings = await aget_user_settings_cached(user_id)
+        day = settings.period_start_day
         await send_message(update, f"📆 Billing period starts on day *{day}* of each month.\n\nChange: `/set_periode [day]` (1-28)")
         return
     
@@ -606,21 +742,23 @@ async def cmd_set_periode(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await send_message(update, "❌ Day must be between 1 and 28.")
         return
     
-    update_user_setting(user_id, period_start_day=day)
+    await asyncio.to_thread(update_user_setting, user_id, period_start_day=day)
+    
+    invalidate_user_settings(user_id)
     await send_message(update, f"✅ Billing period now starts on day *{day}* of each month.")
 
 
 async def cmd_config(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /config command - Show all current settings."""
     user_id = get_user_id(update)
-    settings = get_user_settings(user_id)
-    apparater = get_all_apparater(user_id)
+    settings, apparater = await asyncio.to_thread(get_user_settings_and_appliances, user_id)
+    prime_user_settings(user_id, settings)
     
-    region = settings.get("region", "NO1")
-    fixed_cost = settings.get("fixed_cost_nok", 1.0)
-    budget = settings.get("budget_nok")
-    period_day = settings.get("period_start_day", 1)
-    max_duration = settings.get("max_duration_hours", 0)
+    region = settings.region
+    fixed_cost = settings.fixed_cost_nok
+    budget = settings.budget_nok
+    period_day = settings.period_start_day
+    max_duration = settings.max_duration_hours
     
     text = f"""⚙️ *Your Configuration*
 
@@ -633,9 +771,7 @@ async def cmd_config(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
 *Appliances:* {len(apparater)} registered"""
     
     if apparater:
-        text += "\n"
-        for a in apparater:
-            text += f"\n• {a['name']} ({a['low_watt']}W / {a['high_watt']}W)"
+        text += "\n\n" + "\n".join(f"• {a['name']} ({a['low_watt']}W / {a['high_watt']}W)" for a in apparater)
     
     text += "\n\n_Use /help to see how to change settings_"
     
@@ -645,19 +781,15 @@ async def cmd_config(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None
 async def cmd_clear(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle /clear command - Clear session history."""
     user_id = get_user_id(update)
-    sessions = get_session_history(user_id, limit=100)
+    count, total_kwh, total_cost = await asyncio.to_thread(get_session_totals, user_id)
     
-    if not sessions:
+    if not count:
         await send_message(update, "🗑️ No sessions to clear.")
         return
     
-    # Calculate totals for confirmation
-    total_kwh = sum(s.get("kwh", 0) or 0 for s in sessions)
-    total_cost = sum(s.get("total_cost_nok", 0) or 0 for s in sessions)
-    
     text = f"""⚠️ *Clear all session history?*
 
-This will delete *{len(sessions)} sessions*:
+This will delete *{count} sessions*:
 • {total_kwh:.2f} kWh total
 • {total_cost:.2f} kr total
 
@@ -669,71 +801,51 @@ _This cannot be undone!_"""
 async def callback_clear(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle clear confirmation callback."""
     query = update.callback_query
-    await query.answer()
+    # Clear the button spinner without holding up the handler
+    run_in_background(query.answer())
     
     user_id = get_user_id(update)
-    data = query.data.split(":")
-    
-    if len(data) != 3 or data[0] != "confirm":
-        return
-    
-    action, item = data[1], data[2]
+    _, _, rest = query.data.partition(":")
+    action, _, item = rest.partition(":")
     
     if action == "cancel":
         await query.edit_message_text("❌ Cancelled. Sessions kept.")
         return
     
     if action == "clear":
-        deleted = clear_sessions(user_id)
+        deleted = await asyncio.to_thread(clear_sessions, user_id)
+        invalidate_monthly_cache(user_id)
+        # Clearing also removes a running session
+        _forget_session(context)
         await query.edit_message_text(f"✅ Cleared *{deleted} sessions*.\n\nStarting fresh!", parse_mode="Markdown")
 
 
 async def callback_appliance(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle appliance selection from button."""
     query = update.callback_query
-    await query.answer()
+    # Clear the button spinner without holding up the handler
+    run_in_background(query.answer())
     
     user_id = get_user_id(update)
-    data = query.data.split(":")
-    
-    if len(data) != 3 or data[0] != "app":
-        return
-    
-    action, name = data[1], data[2]
+    _, _, rest = query.data.partition(":")
+    action, _, name = rest.partition(":")
     
     if action == "cancel":
         await query.edit_message_text("❌ Cancelled.")
         return
     
     if action == "use":
-        # Get appliance and show watt mode selection
-        apparat = get_apparat(user_id, name)
-        if not apparat:
+        # Show watt mode selection
+        text = await _build_use_prompt(user_id, name, context)
+        if text is None:
             await query.edit_message_text(f"❌ Appliance *{name}* not found.", parse_mode="Markdown")
             return
         
-        # Get current spot price for display
-        settings = get_user_settings(user_id)
-        region = settings.get("region", "NO1")
-        current_price = await get_current_price(region)
-        price_text = f"{current_price:.4f} kr/kWh" if current_price else "unavailable"
-        
-        avg_watt = (apparat["low_watt"] + apparat["high_watt"]) // 2
-        
-        text = f"""⚡ *Start tracking: {name}*
-
-Select power mode:
-🔋 Low: {apparat['low_watt']}W
-⚡ High: {apparat['high_watt']}W  
-📊 Avg: {avg_watt}W
-
-Current spot price ({region}): {price_text}
-Fixed cost: {settings.get('fixed_cost_nok', 1.0):.2f} kr/kWh"""
-        
         await query.edit_message_text(text, parse_mode="Markdown", reply_markup=get_watt_mode_keyboard(name))
     
     elif action == "delete":
-        success = delete_apparat(user_id, name)
+        success = await asyncio.to_thread(delete_apparat, user_id, name)
+        context.user_data.pop("pending_use", None)
         if success:
             await query.edit_message_text(f"🗑️ *{name}* deleted.", parse_mode="Markdown")
         else:
@@ -743,158 +855,81 @@ Fixed cost: {settings.get('fixed_cost_nok', 1.0):.2f} kr/kWh"""
 async def callback_session(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Handle session action buttons (stop/status/cancel)."""
     query = update.callback_query
-    await query.answer()
+    # Clear the button spinner without holding up the handler
+    run_in_background(query.answer())
     
     user_id = get_user_id(update)
-    data = query.data.split(":")
+    _, _, action = query.data.partition(":")
     
-    if len(data) != 2 or data[0] != "session":
-        return
-    
-    action = data[1]
-    session = get_active_session(user_id)
+    session = await _get_active(user_id, context)
     
     if not session:
         await query.edit_message_text("❌ No active session.")
         return
     
     if action == "stop":
-        # Get user settings
-        settings = get_user_settings(user_id)
-        region = settings.get("region", "NO1")
-        fixed_cost = settings.get("fixed_cost_nok", 1.0)
-        
-        # Parse start time
-        start_time = datetime.fromisoformat(session["start_time"])
-        if start_time.tzinfo is None:
-            start_time = start_time.replace(tzinfo=NORWAY_TZ)
-        end_time = datetime.now(NORWAY_TZ)
-        
-        # Calculate costs
-        result = await calculate_session_cost(
-            start_time, end_time,
-            session["actual_watt"],
-            fixed_cost,
-            region
-        )
-        
-        # Save session
-        end_session(
-            session["id"],
-            result["kwh"],
-            result["spot_cost"],
-            result["fixed_cost"],
-            result["total_cost"]
-        )
-        
-        # Get monthly summary
-        now = datetime.now(NORWAY_TZ)
-        summary = get_monthly_summary(user_id, now.year, now.month)
-        
-        mode_emoji = {"low": "🔋", "high": "⚡", "avg": "📊"}[session["watt_mode"]]
-        duration_str = format_duration(result["hours"])
-        
-        text = f"""✅ *Session ended: {session['apparat_name']}*
-
-⏱ Duration: {duration_str} ({mode_emoji} {session['watt_mode']})
-⚡ Consumption: {result['kwh']:.2f} kWh
-
-💰 *Cost:*
-   Spot: {result['spot_cost']:.2f} kr
-   Fixed: {result['fixed_cost']:.2f} kr
-   *Total: {result['total_cost']:.2f} kr*
-
-📊 *{MONTH_NAMES[now.month]}:* {summary['total_kwh']:.2f} kWh / {summary['total_cost']:.2f} kr"""
-        
+        text = await _finalize_session(user_id, session)
+        _forget_session(context)
         await query.edit_message_text(text, parse_mode="Markdown")
     
     elif action == "status":
-        # Get user settings
-        settings = get_user_settings(user_id)
-        region = settings.get("region", "NO1")
-        fixed_cost = settings.get("fixed_cost_nok", 1.0)
-        
-        # Parse start time
-        start_time = datetime.fromisoformat(session["start_time"])
-        if start_time.tzinfo is None:
-            start_time = start_time.replace(tzinfo=NORWAY_TZ)
-        
-        # Estimate current cost
-        result = await estimate_current_cost(
-            start_time,
-            session["actual_watt"],
-            fixed_cost,
-            region
-        )
-        
-        mode_emoji = {"low": "🔋", "high": "⚡", "avg": "📊"}[session["watt_mode"]]
-        duration_str = format_duration(result["hours"])
-        
-        text = f"""📊 *Active Session*
-
-📟 *{session['apparat_name']}* @ {session['actual_watt']}W ({mode_emoji})
-⏱ Running: {duration_str}
-⚡ Current: {result['kwh']:.3f} kWh
-
-💰 *Estimated:* {result['total_cost']:.2f} kr"""
-        
+        text = await _format_status(user_id, session)
         await query.edit_message_text(text, parse_mode="Markdown", reply_markup=get_session_action_keyboard())
     
     elif action == "cancel":
-        cancel_session(session["id"])
+        await asyncio.to_thread(cancel_session, session["id"])
+        _forget_session(context)
         await query.edit_message_text(f"🚫 *Session cancelled*\n\n{session['apparat_name']} - not recorded.", parse_mode="Markdown")
 
 
 # ============ Setup ============
 
+# (command, handler, menu description) - drives both registration and the command menu
+_COMMANDS: list[tuple[str, Callable, str]] = [
+    ("start", cmd_start, "Welcome & quick start"),
+    ("help", cmd_help, "Full help & formulas"),
+    ("add", cmd_add, "Add appliance [name] [low] [high]"),
+    ("list", cmd_list, "List all appliances"),
+    ("delete", cmd_delete, "Delete appliance [name]"),
+    ("use", cmd_use, "Start tracking [name]"),
+    ("stop", cmd_stop, "End session, show costs"),
+    ("cancel", cmd_cancel, "Cancel without recording"),
+    ("status", cmd_status, "Current session status"),
+    ("mnd", cmd_mnd, "Monthly summary"),
+    ("history", cmd_history, "Recent sessions"),
+    ("budget", cmd_budget, "Set/view budget [kr]"),
+    ("set_fastkost", cmd_set_fastkost, "Set fixed cost [kr/kWh]"),
+    ("set_region", cmd_set_region, "Set price region [NO1-5]"),
+    ("set_periode", cmd_set_periode, "Set billing period [day]"),
+    ("config", cmd_config, "View all settings"),
+    ("clear", cmd_clear, "Clear session history"),
+]
+
+# Callback data prefix -> handler, dispatched by a single CallbackQueryHandler
+_CALLBACK_ROUTES: dict[str, Callable] = {
+    "watt": callback_watt_mode,
+    "region": callback_region,
+    "confirm": callback_clear,
+    "app": callback_appliance,
+    "session": callback_session,
+}
+
+
+async def dispatch_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Route an inline keyboard callback to its handler by data prefix."""
+    prefix, _, _ = update.callback_query.data.partition(":")
+    await _CALLBACK_ROUTES[prefix](update, context)
+
+
 def setup_handlers(application: Application) -> None:
     """Register all command and callback handlers."""
-    # Command handlers
-    application.add_handler(CommandHandler("start", cmd_start))
-    application.add_handler(CommandHandler("help", cmd_help))
-    application.add_handler(CommandHandler("add", cmd_add))
-    application.add_handler(CommandHandler("list", cmd_list))
-    application.add_handler(CommandHandler("delete", cmd_delete))
-    application.add_handler(CommandHandler("use", cmd_use))
-    application.add_handler(CommandHandler("stop", cmd_stop))
-    application.add_handler(CommandHandler("cancel", cmd_cancel))
-    application.add_handler(CommandHandler("status", cmd_status))
-    application.add_handler(CommandHandler("mnd", cmd_mnd))
-    application.add_handler(CommandHandler("history", cmd_history))
-    application.add_handler(CommandHandler("budget", cmd_budget))
-    application.add_handler(CommandHandler("set_fastkost", cmd_set_fastkost))
-    application.add_handler(CommandHandler("set_region", cmd_set_region))
-    application.add_handler(CommandHandler("set_periode", cmd_set_periode))
-    application.add_handler(CommandHandler("config", cmd_config))
-    application.add_handler(CommandHandler("clear", cmd_clear))
-    
-    # Callback query handlers
-    application.add_handler(CallbackQueryHandler(callback_watt_mode, pattern=r"^watt:"))
-    application.add_handler(CallbackQueryHandler(callback_region, pattern=r"^region:"))
-    application.add_handler(CallbackQueryHandler(callback_clear, pattern=r"^confirm:"))
-    application.add_handler(CallbackQueryHandler(callback_appliance, pattern=r"^app:"))
-    application.add_handler(CallbackQueryHandler(callback_session, pattern=r"^session:"))
+    application.add_handlers(
+        [CommandHandler(name, handler) for name, handler, _ in _COMMANDS]
+        + [CallbackQueryHandler(dispatch_callback, pattern=r"^(watt|region|confirm|app|session):")]
+    )
 
 
 async def set_commands(application: Application) -> None:
     """Set bot commands for the command menu."""
-    commands = [
-        BotCommand("start", "Welcome & quick start"),
-        BotCommand("help", "Full help & formulas"),
-        BotCommand("add", "Add appliance [name] [low] [high]"),
-        BotCommand("list", "List all appliances"),
-        BotCommand("delete", "Delete appliance [name]"),
-        BotCommand("use", "Start tracking [name]"),
-        BotCommand("stop", "End session, show costs"),
-        BotCommand("cancel", "Cancel without recording"),
-        BotCommand("status", "Current session status"),
-        BotCommand("mnd", "Monthly summary"),
-        BotCommand("history", "Recent sessions"),
-        BotCommand("budget", "Set/view budget [kr]"),
-        BotCommand("set_fastkost", "Set fixed cost [kr/kWh]"),
-        BotCommand("set_region", "Set price region [NO1-5]"),
-        BotCommand("set_periode", "Set billing period [day]"),
-        BotCommand("config", "View all settings"),
-        BotCommand("clear", "Clear session history"),
-    ]
+    commands = [BotCommand(name, description) for name, _, description in _COMMANDS]
     await application.bot.set_my_commands(commands)
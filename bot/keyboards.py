@@ -61,18 +61,15 @@ def get_appliance_keyboard(apparater: list, action: str = "use") -> InlineKeyboa
     Create keyboard for selecting an appliance.
     action: 'use' or 'delete'
     """
-    keyboard = []
+    buttons = [
+        InlineKeyboardButton(
+            f"{a['name']} ({(a['low_watt'] + a['high_watt']) // 2}W)",
+            callback_data=f"app:{action}:{a['name']}",
+        )
+        for a in apparater
+    ]
     # 2 appliances per row for mobile
-    row = []
-    for a in apparater:
-        name = a["name"]
-        avg = (a["low_watt"] + a["high_watt"]) // 2
-        row.append(InlineKeyboardButton(f"{name} ({avg}W)", callback_data=f"app:{action}:{name}"))
-        if len(row) == 2:
-            keyboard.append(row)
-            row = []
-    if row:
-        keyboard.append(row)
+    keyboard = [buttons[i:i + 2] for i in range(0, len(buttons), 2)]
     
     keyboard.append([InlineKeyboardButton("❌ Cancel", callback_data=f"app:cancel:")])
     return InlineKeyboardMarkup(keyboard)
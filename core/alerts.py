@@ -2,34 +2,80 @@
 Alert system for budget warnings and runtime notifications.
 """
 
+import asyncio
+import threading
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from zoneinfo import ZoneInfo
 
-from database.models import get_monthly_sessions, get_user_settings, get_active_session
+from database.models import UserSettings, get_monthly_totals, get_active_session
+from database.settings_cache import get_user_settings_cached, aget_user_settings_cached
 from core.calculator import estimate_current_cost, NORWAY_TZ
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Monthly totals are re-read at most once per TTL unless a session write invalidates them
+MONTHLY_TTL = 60.0
 
-async def check_budget_alert(user_id: int) -> Optional[str]:
+# (user_id, year, month, period_start_day) -> (stored_at, (total_cost, total_kwh, total_spot, total_fixed, count))
+_monthly_cache: dict[tuple[int, int, int, int], tuple[float, tuple[float, float, float, float, int]]] = {}
+
+# Filled from to_thread workers and invalidated from the event loop
+_monthly_lock = threading.Lock()
+
+# Marks an argument the caller did not pass, as opposed to an explicit None
+_UNSET = object()
+
+
+def _get_monthly_totals(
+    user_id: int, year: int, month: int, period_start_day: int
+) -> tuple[float, float, float, float, int]:
     """
-    Check if user is approaching or exceeding budget.
-    Returns alert message if triggered, None otherwise.
+    Get (total_cost, total_kwh, total_spot, total_fixed, count) for a billing month.
+    Cached for MONTHLY_TTL seconds.
     """
-    settings = get_user_settings(user_id)
-    budget = settings.get("budget_nok")
+    key = (user_id, year, month, period_start_day)
+    now = time.monotonic()
+    with _monthly_lock:
+        entry = _monthly_cache.get(key)
+    if entry and now - entry[0] < MONTHLY_TTL:
+        return entry[1]
+    
+    totals = get_monthly_totals(user_id, year, month, period_start_day)
+    with _monthly_lock:
+        # Drop expired entries so months nobody asks about again don't pile up
+        for stale in [k for k, (stored_at, _) in _monthly_cache.items() if now - stored_at >= MONTHLY_TTL]:
+            del _monthly_cache[stale]
+        _monthly_cache[key] = (now, totals)
+    return totals
+
+
+def invalidate_monthly_cache(user_id: int) -> None:
+    """Drop cached monthly totals for a user (call after a session is stopped or cleared)."""
+    with _monthly_lock:
+        for key in [k for k in _monthly_cache if k[0] == user_id]:
+            del _monthly_cache[key]
+
+
+def _session_hours(session: dict) -> float:
+    """Hours an active session has been running."""
+    return (time.time() - session["start_ts"]) / 3600
+
+
+async def _budget_message(user_id: int, settings: UserSettings, now: datetime) -> Optional[str]:
+    """Apply the budget rule: warn at 80% of the monthly budget, alert at 100%."""
+    budget = settings.budget_nok
     
     if not budget or budget <= 0:
         return None
     
     # Get current month's total
-    now = datetime.now(NORWAY_TZ)
-    sessions = get_monthly_sessions(user_id, now.year, now.month, settings.get("period_start_day", 1))
-    
-    total_cost = sum(s.get("total_cost_nok", 0) or 0 for s in sessions)
+    total_cost, *_ = await asyncio.to_thread(
+        _get_monthly_totals, user_id, now.year, now.month, settings.period_start_day
+    )
     percentage = (total_cost / budget) * 100
     
     if percentage >= 100:
@@ -41,29 +87,77 @@ async def check_budget_alert(user_id: int) -> Optional[str]:
     return None
 
 
+def _runtime_message(session: dict, hours: float) -> Optional[str]:
+    """Apply the runtime rule: flag sessions running 2 hours or more."""
+    if hours >= 2:
+        apparat_name = session.get("apparat_name", "Unknown")
+        return f"⏰ **Long session:** {apparat_name} has been running for {hours:.1f} hours. Use /stop when done or /cancel to abort."
+    
+    return None
+
+
+def _max_duration_message(session: dict, hours: float, max_hours: int) -> Optional[str]:
+    """Apply the max duration rule, if the user has enabled it."""
+    if not max_hours or max_hours <= 0:
+        return None  # Feature disabled
+    
+    if hours >= max_hours:
+        apparat_name = session.get("apparat_name", "Unknown")
+        return f"🛑 **Max duration reached:** {apparat_name} has been running for {hours:.1f}h (limit: {max_hours}h). Session should be stopped."
+    
+    return None
+
+
+async def check_all_alerts(
+    user_id: int,
+    session: Optional[dict] = _UNSET,
+    settings: UserSettings = _UNSET,
+    include_budget: bool = True,
+) -> list[str]:
+    """
+    Run the budget, runtime and max duration checks in one sweep.
+    Settings and the active session are read once and shared by all three rules;
+    callers that already hold them (e.g. /status) can pass them in to skip the lookups;
+    session=None means the caller knows there is no active session.
+    include_budget=False skips the budget rule (/status leaves it to /stop).
+    Returns the triggered alert messages (possibly empty).
+    """
+    if settings is _UNSET:
+        settings = await aget_user_settings_cached(user_id)
+    if session is _UNSET:
+        session = await asyncio.to_thread(get_active_session, user_id)
+    now = datetime.now(NORWAY_TZ)
+    
+    alerts = [await _budget_message(user_id, settings, now)] if include_budget else []
+    
+    if session:
+        hours = _session_hours(session)
+        alerts.append(_runtime_message(session, hours))
+        alerts.append(_max_duration_message(session, hours, settings.max_duration_hours))
+    
+    return [alert for alert in alerts if alert]
+
+
+async def check_budget_alert(user_id: int) -> Optional[str]:
+    """
+    Check if user is approaching or exceeding budget.
+    Returns alert message if triggered, None otherwise.
+    """
+    settings = await aget_user_settings_cached(user_id)
+    return await _budget_message(user_id, settings, datetime.now(NORWAY_TZ))
+
+
 async def check_runtime_alert(user_id: int) -> Optional[str]:
     """
     Check if active session has been running too long.
     Returns alert message if running > 2 hours, None otherwise.
     """
-    session = get_active_session(user_id)
+    session = await asyncio.to_thread(get_active_session, user_id)
     
     if not session:
         return None
     
-    start_time = datetime.fromisoformat(session["start_time"])
-    if start_time.tzinfo is None:
-        start_time = start_time.replace(tzinfo=NORWAY_TZ)
-    
-    now = datetime.now(NORWAY_TZ)
-    duration = now - start_time
-    hours = duration.total_seconds() / 3600
-    
-    if hours >= 2:
-        apparat_name = session.get("apparat_name", "Unknown")
-        return f"⏰ **Long session:** {apparat_name} has been running for {hours:.1f} hours. Use /stop when done or /cancel to abort."
-    
-    return None
+    return _runtime_message(session, _session_hours(session))
 
 
 async def check_max_duration(user_id: int) -> Optional[str]:
@@ -71,29 +165,17 @@ async def check_max_duration(user_id: int) -> Optional[str]:
     Check if session exceeds max duration setting (auto-stop warning).
     Returns message if max duration reached and enabled.
     """
-    settings = get_user_settings(user_id)
-    max_hours = settings.get("max_duration_hours", 0)
+    settings = await aget_user_settings_cached(user_id)
+    max_hours = settings.max_duration_hours
     
     if not max_hours or max_hours <= 0:
         return None  # Feature disabled
     
-    session = get_active_session(user_id)
+    session = await asyncio.to_thread(get_active_session, user_id)
     if not session:
         return None
     
-    start_time = datetime.fromisoformat(session["start_time"])
-    if start_time.tzinfo is None:
-        start_time = start_time.replace(tzinfo=NORWAY_TZ)
-    
-    now = datetime.now(NORWAY_TZ)
-    duration = now - start_time
-    hours = duration.total_seconds() / 3600
-    
-    if hours >= max_hours:
-        apparat_name = session.get("apparat_name", "Unknown")
-        return f"🛑 **Max duration reached:** {apparat_name} has been running for {hours:.1f}h (limit: {max_hours}h). Session should be stopped."
-    
-    return None
+    return _max_duration_message(session, _session_hours(session), max_hours)
 
 
 def get_monthly_summary(user_id: int, year: Optional[int] = None, month: Optional[int] = None) -> dict:
@@ -106,23 +188,20 @@ def get_monthly_summary(user_id: int, year: Optional[int] = None, month: Optiona
     if month is None:
         month = now.month
     
-    settings = get_user_settings(user_id)
-    sessions = get_monthly_sessions(user_id, year, month, settings.get("period_start_day", 1))
-    
-    total_kwh = sum(s.get("kwh", 0) or 0 for s in sessions)
-    total_cost = sum(s.get("total_cost_nok", 0) or 0 for s in sessions)
-    total_spot = sum(s.get("spot_cost_nok", 0) or 0 for s in sessions)
-    total_fixed = sum(s.get("fixed_cost_nok", 0) or 0 for s in sessions)
+    settings = get_user_settings_cached(user_id)
+    total_cost, total_kwh, total_spot, total_fixed, session_count = _get_monthly_totals(
+        user_id, year, month, settings.period_start_day
+    )
     
     avg_price = total_cost / total_kwh if total_kwh > 0 else 0
     
-    budget = settings.get("budget_nok")
+    budget = settings.budget_nok
     remaining = budget - total_cost if budget else None
     
     return {
         "year": year,
         "month": month,
-        "session_count": len(sessions),
+        "session_count": session_count,
         "total_kwh": round(total_kwh, 2),
         "total_cost": round(total_cost, 2),
         "spot_cost": round(total_spot, 2),
@@ -130,5 +209,5 @@ def get_monthly_summary(user_id: int, year: Optional[int] = None, month: Optiona
         "avg_price_per_kwh": round(avg_price, 2),
         "budget": budget,
         "remaining": round(remaining, 2) if remaining is not None else None,
-        "region": settings.get("region", "NO1")
+        "region": settings.region
     }
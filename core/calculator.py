@@ -3,7 +3,9 @@ Cost calculation module for electricity usage tracking.
 Implements hour-by-hour accurate pricing.
 """
 
-from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 from zoneinfo import ZoneInfo
 
@@ -14,6 +16,18 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class SessionCost:
+    """Cost of a (possibly still running) session."""
+    hours: float
+    kwh: float
+    spot_cost: float
+    fixed_cost: float
+    total_cost: float
+    avg_spot_price: float
+    hourly_breakdown: list = field(default_factory=list)
+
+
 def calculate_watt(low_watt: int, high_watt: int, mode: str) -> int:
     """
     Calculate actual wattage based on mode.
@@ -39,8 +53,9 @@ async def calculate_session_cost(
     end_time: datetime,
     watt: int,
     fixed_cost_per_kwh: float,
-    region: str = "NO1"
-) -> dict:
+    region: str = "NO1",
+    detailed: bool = False
+) -> SessionCost:
     """
     Calculate the cost of a session using hour-by-hour spot prices.
     
@@ -53,16 +68,17 @@ async def calculate_session_cost(
         watt: Power consumption in watts
         fixed_cost_per_kwh: Fixed cost (nettleie + avgifter) per kWh with MVA
         region: Price region (NO1-NO5)
+        detailed: Also build the per-hour breakdown
     
     Returns:
-        dict with:
+        SessionCost with:
             - hours: Total duration in hours
             - kwh: Total energy consumption
             - spot_cost: Cost from spot prices
             - fixed_cost: Cost from fixed charges
             - total_cost: Total cost
             - avg_spot_price: Average spot price for the session
-            - hourly_breakdown: List of hourly calculations (for detailed view)
+            - hourly_breakdown: List of hourly calculations (empty unless detailed)
     """
     # Ensure times are in Norwegian timezone
     if start_time.tzinfo is None:
@@ -70,19 +86,12 @@ async def calculate_session_cost(
     if end_time.tzinfo is None:
         end_time = end_time.replace(tzinfo=NORWAY_TZ)
     
-    duration = end_time - start_time
-    total_hours = duration.total_seconds() / 3600
+    # Elapsed time from timestamps; same-zone datetime subtraction is wall clock and
+    # would be an hour off across a DST change
+    total_hours = (end_time.timestamp() - start_time.timestamp()) / 3600
     
     if total_hours <= 0:
-        return {
-            "hours": 0,
-            "kwh": 0,
-            "spot_cost": 0,
-            "fixed_cost": 0,
-            "total_cost": 0,
-            "avg_spot_price": 0,
-            "hourly_breakdown": []
-        }
+        return SessionCost(hours=0, kwh=0, spot_cost=0, fixed_cost=0, total_cost=0, avg_spot_price=0)
     
     # Get hourly prices for the period
     hourly_prices = await get_prices_for_period(start_time, end_time, region)
@@ -98,49 +107,47 @@ async def calculate_session_cost(
         spot_cost = kwh * current_price
         fixed_cost = kwh * fixed_cost_per_kwh
         
-        return {
-            "hours": round(total_hours, 2),
-            "kwh": round(kwh, 4),
-            "spot_cost": round(spot_cost, 2),
-            "fixed_cost": round(fixed_cost, 2),
-            "total_cost": round(spot_cost + fixed_cost, 2),
-            "avg_spot_price": round(current_price, 4),
-            "hourly_breakdown": []
-        }
+        return SessionCost(
+            hours=round(total_hours, 2),
+            kwh=round(kwh, 4),
+            spot_cost=round(spot_cost, 2),
+            fixed_cost=round(fixed_cost, 2),
+            total_cost=round(spot_cost + fixed_cost, 2),
+            avg_spot_price=round(current_price, 4),
+        )
     
-    # Calculate cost for each hour
+    # Calculate cost for each hour, working on epoch seconds
     breakdown = []
     total_spot_cost = 0
     total_kwh = 0
+    start_ts = start_time.timestamp()
+    end_ts = end_time.timestamp()
+    kw = watt / 1000
     
-    for i, (hour_start, price) in enumerate(hourly_prices):
-        # Calculate how much of this hour was used
-        hour_end = hour_start + timedelta(hours=1)
+    for hour_start, price in hourly_prices:
+        hour_ts = hour_start.timestamp()
         
-        # Clip to session boundaries
-        actual_start = max(hour_start, start_time)
-        actual_end = min(hour_end, end_time)
-        
-        # Calculate fraction of hour used
-        hour_fraction = (actual_end - actual_start).total_seconds() / 3600
+        # Fraction of this hour used, clipped to session boundaries
+        hour_fraction = (min(hour_ts + 3600, end_ts) - max(hour_ts, start_ts)) / 3600
         
         if hour_fraction <= 0:
             continue
         
         # Calculate consumption and cost for this hour
-        hour_kwh = hour_fraction * (watt / 1000)
+        hour_kwh = hour_fraction * kw
         hour_spot_cost = hour_kwh * price
         
         total_kwh += hour_kwh
         total_spot_cost += hour_spot_cost
         
-        breakdown.append({
-            "hour": hour_start.strftime("%H:%M"),
-            "fraction": round(hour_fraction, 2),
-            "price": round(price, 4),
-            "kwh": round(hour_kwh, 4),
-            "cost": round(hour_spot_cost, 2)
-        })
+        if detailed:
+            breakdown.append({
+                "hour": hour_start.strftime("%H:%M"),
+                "fraction": round(hour_fraction, 2),
+                "price": round(price, 4),
+                "kwh": round(hour_kwh, 4),
+                "cost": round(hour_spot_cost, 2)
+            })
     
     # Calculate fixed cost based on total kWh
     total_fixed_cost = total_kwh * fixed_cost_per_kwh
@@ -148,15 +155,15 @@ async def calculate_session_cost(
     # Calculate average spot price
     avg_spot_price = total_spot_cost / total_kwh if total_kwh > 0 else 0
     
-    return {
-        "hours": round(total_hours, 2),
-        "kwh": round(total_kwh, 4),
-        "spot_cost": round(total_spot_cost, 2),
-        "fixed_cost": round(total_fixed_cost, 2),
-        "total_cost": round(total_spot_cost + total_fixed_cost, 2),
-        "avg_spot_price": round(avg_spot_price, 4),
-        "hourly_breakdown": breakdown
-    }
+    return SessionCost(
+        hours=round(total_hours, 2),
+        kwh=round(total_kwh, 4),
+        spot_cost=round(total_spot_cost, 2),
+        fixed_cost=round(total_fixed_cost, 2),
+        total_cost=round(total_spot_cost + total_fixed_cost, 2),
+        avg_spot_price=round(avg_spot_price, 4),
+        hourly_breakdown=breakdown,
+    )
 
 
 async def estimate_current_cost(
@@ -164,7 +171,7 @@ async def estimate_current_cost(
     watt: int,
     fixed_cost_per_kwh: float,
     region: str = "NO1"
-) -> dict:
+) -> SessionCost:
     """
     Estimate the current running cost of an active session.
     Uses the same hour-by-hour calculation.
@@ -175,7 +182,12 @@ async def estimate_current_cost(
 
 def format_duration(hours: float) -> str:
     """Format duration in hours to human-readable string."""
-    total_minutes = int(hours * 60)
+    return _format_minutes(int(hours * 60))
+
+
+@lru_cache(maxsize=256)
+def _format_minutes(total_minutes: int) -> str:
+    """Format whole minutes; cached since history and status repeat the same values."""
     h = total_minutes // 60
     m = total_minutes % 60
     
@@ -3,14 +3,22 @@ Price API module for fetching NO1-NO5 spot prices from hvakosterstrommen.no.
 Includes caching to minimize API calls.
 """
 
+import asyncio
 import aiohttp
+import json
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 from typing import Optional
 from zoneinfo import ZoneInfo
 
 from database.models import cache_prices, get_cached_prices
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson is optional; stdlib json also accepts bytes
+    _json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
 # Norwegian timezone
@@ -20,12 +28,68 @@ NORWAY_TZ = ZoneInfo("Europe/Oslo")
 API_BASE = "https://www.hvakosterstrommen.no/api/v1/prices"
 
 # Valid regions
-VALID_REGIONS = {"NO1", "NO2", "NO3", "NO4", "NO5"}
+VALID_REGIONS = frozenset({"NO1", "NO2", "NO3", "NO4", "NO5"})
+
+# Sorted, comma-separated list for error messages
+VALID_REGIONS_TEXT = ", ".join(sorted(VALID_REGIONS))
 
 # MVA rate (25% for all regions except NO4)
 MVA_RATE = 0.25
 MVA_EXEMPT_REGIONS = {"NO4"}  # Nord-Norge is exempt from MVA
 
+# Spot price multiplier per region (MVA added where it applies)
+_MVA_MULT = {r: 1.0 if r in MVA_EXEMPT_REGIONS else (1 + MVA_RATE) for r in VALID_REGIONS}
+
+# Human-readable region names
+_REGION_NAMES = {
+    "NO1": "Oslo / Øst-Norge",
+    "NO2": "Kristiansand / Sør-Norge",
+    "NO3": "Trondheim / Midt-Norge",
+    "NO4": "Tromsø / Nord-Norge",
+    "NO5": "Bergen / Vest-Norge"
+}
+
+# Shared HTTP session, created lazily so it binds to the running event loop
+_SESSION: Optional[aiohttp.ClientSession] = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Get the shared aiohttp session, creating it on first use.
+    Reusing one session keeps connections to the price API alive between fetches.
+    """
+    global _SESSION
+    if _SESSION is None or _SESSION.closed:
+        _SESSION = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=10),
+            connector=aiohttp.TCPConnector(limit=10, ttl_dns_cache=300),
+        )
+    return _SESSION
+
+
+# In-flight downloads keyed by (date, region), so concurrent misses share one request
+_inflight: dict[tuple[str, str], asyncio.Future] = {}
+
+# Process-local copy of recently used days, (date, region) -> hourly prices.
+# Day-ahead prices never change once published, so entries only leave in insertion order.
+MEM_CACHE_SIZE = 30
+_mem_cache: dict[tuple[str, str], dict[int, float]] = {}
+
+
+def _remember(key: tuple[str, str], prices: dict[int, float]) -> None:
+    """Store a day's prices in the in-process cache, evicting the oldest day when full."""
+    if key not in _mem_cache and len(_mem_cache) >= MEM_CACHE_SIZE:
+        del _mem_cache[next(iter(_mem_cache))]
+    _mem_cache[key] = prices
+
+
+async def close_session() -> None:
+    """Close the shared aiohttp session (call on shutdown)."""
+    global _SESSION
+    if _SESSION is not None and not _SESSION.closed:
+        await _SESSION.close()
+    _SESSION = None
+
 
 async def fetch_daily_prices(date: datetime, region: str = "NO1") -> Optional[dict[int, float]]:
     """
@@ -39,37 +103,61 @@ async def fetch_daily_prices(date: datetime, region: str = "NO1") -> Optional[di
         return None
     
     date_str = date.strftime("%Y-%m-%d")
+    key = (date_str, region)
     
-    # Check cache first
-    cached = get_cached_prices(date_str, region)
+    # Check the in-process cache, then the database cache
+    prices = _mem_cache.get(key)
+    if prices:
+        return prices
+    
+    cached = await asyncio.to_thread(get_cached_prices, date_str, region)
     if cached:
         logger.debug(f"Using cached prices for {date_str} {region}")
+        _remember(key, cached)
         return cached
     
+    # Join a download already in progress for the same day instead of issuing another
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_download_daily_prices(date, date_str, region))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    
+    # Shield so one cancelled caller does not cancel the download for the others
+    prices = await asyncio.shield(task)
+    if prices:
+        _remember(key, prices)
+    return prices
+
+
+async def _download_daily_prices(date: datetime, date_str: str, region: str) -> Optional[dict[int, float]]:
+    """
+    Download, parse and cache one day's prices from the API.
+    Returns dict of hour (0-23) -> price in NOK/kWh (with MVA added).
+    """
     # Fetch from API
     url = f"{API_BASE}/{date.strftime('%Y')}/{date.strftime('%m-%d')}_{region}.json"
     logger.info(f"Fetching prices from: {url}")
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=aiohttp.ClientTimeout(total=10)) as response:
-                if response.status != 200:
-                    logger.error(f"API returned status {response.status}")
-                    return None
-                
-                data = await response.json()
+        session = get_session()
+        async with session.get(url) as response:
+            if response.status != 200:
+                logger.error(f"API returned status {response.status}")
+                return None
+            
+            data = _json_loads(await response.read())
     except Exception as e:
         logger.error(f"Failed to fetch prices: {e}")
         return None
     
     # Parse response and add MVA
     prices = {}
-    mva_multiplier = 1.0 if region in MVA_EXEMPT_REGIONS else (1 + MVA_RATE)
+    mva_multiplier = _MVA_MULT[region]
     
     for entry in data:
-        # Parse the hour from time_start
-        time_start = datetime.fromisoformat(entry["time_start"])
-        hour = time_start.hour
+        # Hour from time_start ("YYYY-MM-DDTHH:MM:SS+HH:MM"), read straight from the string
+        hour = int(entry["time_start"][11:13])
         
         # Get price and add MVA
         price_raw = entry["NOK_per_kWh"]
@@ -77,7 +165,7 @@ async def fetch_daily_prices(date: datetime, region: str = "NO1") -> Optional[di
         prices[hour] = round(price_with_mva, 5)
     
     # Cache the prices
-    cache_prices(date_str, region, list(prices.items()))
+    await asyncio.to_thread(cache_prices, date_str, region, list(prices.items()))
     logger.info(f"Cached {len(prices)} hourly prices for {date_str} {region}")
     
     return prices
@@ -133,25 +221,45 @@ async def get_prices_for_period(start: datetime, end: datetime, region: str = "N
     else:
         end = end.astimezone(NORWAY_TZ)
     
-    prices_list = []
-    current = start.replace(minute=0, second=0, microsecond=0)
+    first_hour = start.replace(minute=0, second=0, microsecond=0)
+    if first_hour >= end:
+        return []
     
-    while current < end:
-        price = await get_price_for_hour(current, region)
-        if price is not None:
-            prices_list.append((current, price))
-        current += timedelta(hours=1)
+    # Every day the period touches (an end exactly at midnight does not touch that day)
+    first_date = first_hour.date()
+    day_count = ((end - timedelta(microseconds=1)).date() - first_date).days + 1
+    dates = [first_date + timedelta(days=i) for i in range(day_count)]
+    
+    # Days already held in memory need no await; fetch the rest once each, concurrently
+    daily = [_mem_cache.get((d.isoformat(), region)) for d in dates]
+    missing = [i for i, prices in enumerate(daily) if not prices]
+    if missing:
+        fetched = await asyncio.gather(
+            *(fetch_daily_prices(datetime.combine(dates[i], time(), NORWAY_TZ), region) for i in missing)
+        )
+        for i, prices in zip(missing, fetched):
+            daily[i] = prices
+    
+    # Walk the hours each day has prices for, in hour order. Prices are keyed by local
+    # hour: the spring DST day simply has no 02, while on the autumn day the repeated
+    # 02 has a single stored price, which is used for both of its hours.
+    # Bounds are compared as timestamps, since same-zone datetimes compare by wall clock.
+    first_ts = first_hour.timestamp()
+    end_ts = end.timestamp()
+    prices_list = []
+    for d, day_prices in zip(dates, daily):
+        if not day_prices:
+            continue
+        for h, price in day_prices.items():
+            hour = datetime(d.year, d.month, d.day, h, tzinfo=NORWAY_TZ)
+            repeat = hour.replace(fold=1)
+            for instant in (hour, repeat) if repeat.utcoffset() != hour.utcoffset() else (hour,):
+                if first_ts <= instant.timestamp() < end_ts:
+                    prices_list.append((instant, price))
     
     return prices_list
 
 
 def format_region_name(region: str) -> str:
     """Get human-readable name for a region."""
-    names = {
-        "NO1": "Oslo / Øst-Norge",
-        "NO2": "Kristiansand / Sør-Norge",
-        "NO3": "Trondheim / Midt-Norge",
-        "NO4": "Tromsø / Nord-Norge",
-        "NO5": "Bergen / Vest-Norge"
-    }
-    return names.get(region, region)
+    return _REGION_NAMES.get(region, region)
@@ -5,8 +5,14 @@ Uses SQLite for persistent storage.
 
 import sqlite3
 import os
-from datetime import datetime
-from typing import Optional
+import queue
+import threading
+from calendar import monthrange
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Iterator, Optional
 import logging
 from zoneinfo import ZoneInfo
 
@@ -19,77 +25,228 @@ NORWAY_TZ = ZoneInfo("Europe/Oslo")
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "stromtracker.db")
 
 
-def get_connection() -> sqlite3.Connection:
-    """Get a database connection with row factory enabled."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+@dataclass(slots=True, frozen=True)
+class UserSettings:
+    """A user's settings row. Defaults match the user_settings table."""
+    user_id: int
+    fixed_cost_nok: float = 1.0
+    budget_nok: Optional[float] = None
+    period_start_day: int = 1
+    region: str = "NO1"
+    max_duration_hours: int = 0
 
 
-def init_database() -> None:
-    """Initialize the database with all required tables."""
-    conn = get_connection()
-    cursor = conn.cursor()
+# Number of connections kept open and shared by all threads
+POOL_SIZE = 4
+
+# Compiled statements kept per connection; comfortably above the number of distinct queries here
+STATEMENT_CACHE_SIZE = 128
+
+
+class ConnectionPool:
+    """
+    A fixed set of long-lived connections handed out one caller at a time.
+    Connections stay open between calls, so SQLite's page cache stays warm.
+    """
     
-    # Appliances table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS apparater (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            name TEXT NOT NULL,
-            low_watt INTEGER NOT NULL,
-            high_watt INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE(user_id, name COLLATE NOCASE)
-        )
-    """)
+    def __init__(self, path: str, size: int = POOL_SIZE):
+        self.path = path
+        self.closed = False
+        self._idle: queue.Queue[sqlite3.Connection] = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._idle.put(self._open())
     
-    # Sessions table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            apparat_id INTEGER NOT NULL,
-            start_time TIMESTAMP NOT NULL,
-            end_time TIMESTAMP,
-            watt_mode TEXT NOT NULL,
-            actual_watt INTEGER NOT NULL,
-            kwh REAL,
-            spot_cost_nok REAL,
-            fixed_cost_nok REAL,
-            total_cost_nok REAL,
-            cancelled BOOLEAN DEFAULT FALSE,
-            FOREIGN KEY (apparat_id) REFERENCES apparater(id)
+    def _open(self) -> sqlite3.Connection:
+        """Open a connection with row factory and per-connection PRAGMAs."""
+        # isolation_level=None: autocommit; multi-statement writes use txn() explicitly
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            isolation_level=None,
+            uri=self.path.startswith("file:"),  # e.g. file::memory:?cache=shared
         )
-    """)
+        conn.row_factory = sqlite3.Row
+        # Per-connection tuning (these settings are not stored in the DB file).
+        # synchronous=NORMAL is safe with WAL: a crash can lose the last commits but never corrupts the DB
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")  # Wait for a competing writer instead of failing
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-20000")  # ~20 MB page cache
+        return conn
     
-    # User settings table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_settings (
-            user_id INTEGER PRIMARY KEY,
-            fixed_cost_nok REAL DEFAULT 1.0,
-            budget_nok REAL,
-            period_start_day INTEGER DEFAULT 1,
-            region TEXT DEFAULT 'NO1',
-            max_duration_hours INTEGER DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
+    def acquire(self) -> sqlite3.Connection:
+        """Take a connection, blocking until one is free."""
+        return self._idle.get()
     
-    # Price cache table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS price_cache (
-            date TEXT NOT NULL,
-            region TEXT NOT NULL,
-            hour INTEGER NOT NULL,
-            price_nok REAL NOT NULL,
-            cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            PRIMARY KEY (date, region, hour)
-        )
-    """)
+    def release(self, conn: sqlite3.Connection) -> None:
+        """Return a connection; connections of a closed pool are closed instead."""
+        if self.closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+    
+    def close(self) -> None:
+        """Close idle connections; connections still in use close on release."""
+        self.closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ConnectionPool:
+    """Get the pool for the current DB_PATH, replacing it if the path changed."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.path != DB_PATH:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(DB_PATH)
+        return _pool
+
+
+@contextmanager
+def get_conn() -> Iterator[sqlite3.Connection]:
+    """
+    Borrow a pooled connection for the duration of a with block.
+    Connections are in autocommit mode: each statement commits on its own unless run
+    inside txn(). An open transaction is rolled back if the block raises.
+    """
+    pool = _get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        pool.release(conn)
+
+
+@contextmanager
+def txn(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """
+    Run a block as one write transaction (one commit, one WAL sync).
+    BEGIN IMMEDIATE takes the write lock up front, so the block cannot fail
+    halfway with a lock upgrade error.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def init_database() -> None:
+    """Initialize the database with all required tables."""
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        
+        # WAL lets readers run while a write is in progress; the mode is stored in the DB file.
+        # In-memory databases cannot use WAL.
+        if ":memory:" not in DB_PATH and "mode=memory" not in DB_PATH:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        
+        with txn(conn):
+            # Appliances table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS apparater (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    low_watt INTEGER NOT NULL,
+                    high_watt INTEGER NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(user_id, name COLLATE NOCASE)
+                )
+            """)
+            
+            # Sessions table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    apparat_id INTEGER NOT NULL,
+                    apparat_name TEXT,
+                    start_time TIMESTAMP NOT NULL,
+                    end_time TIMESTAMP,
+                    start_ts INTEGER,
+                    end_ts INTEGER,
+                    watt_mode TEXT NOT NULL,
+                    actual_watt INTEGER NOT NULL,
+                    kwh REAL,
+                    spot_cost_nok REAL,
+                    fixed_cost_nok REAL,
+                    total_cost_nok REAL,
+                    cancelled BOOLEAN DEFAULT FALSE,
+                    FOREIGN KEY (apparat_id) REFERENCES apparater(id)
+                )
+            """)
+            
+            # User settings table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS user_settings (
+                    user_id INTEGER PRIMARY KEY,
+                    fixed_cost_nok REAL DEFAULT 1.0,
+                    budget_nok REAL,
+                    period_start_day INTEGER DEFAULT 1,
+                    region TEXT DEFAULT 'NO1',
+                    max_duration_hours INTEGER DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Price cache table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS price_cache (
+                    date TEXT NOT NULL,
+                    region TEXT NOT NULL,
+                    hour INTEGER NOT NULL,
+                    price_nok REAL NOT NULL,
+                    cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (date, region, hour)
+                )
+            """)
+            
+            # Migration: unix-second copies of start/end time, used for all filtering and ordering
+            columns = {row["name"] for row in cursor.execute("PRAGMA table_info(sessions)")}
+            if "start_ts" not in columns:
+                cursor.execute("ALTER TABLE sessions ADD COLUMN start_ts INTEGER")
+                cursor.execute("ALTER TABLE sessions ADD COLUMN end_ts INTEGER")
+                cursor.execute("""
+                    UPDATE sessions
+                    SET start_ts = CAST(strftime('%s', start_time) AS INTEGER),
+                        end_ts = CAST(strftime('%s', end_time) AS INTEGER)
+                """)
+                logger.info("Migrated sessions to integer timestamps")
+            
+            # Migration: copy of the appliance name, so session reads need no JOIN
+            if "apparat_name" not in columns:
+                cursor.execute("ALTER TABLE sessions ADD COLUMN apparat_name TEXT")
+                cursor.execute("""
+                    UPDATE sessions
+                    SET apparat_name = (SELECT name FROM apparater WHERE apparater.id = sessions.apparat_id)
+                """)
+                logger.info("Migrated sessions to stored appliance names")
+            
+            # Per-user session lookups: active session (end_ts IS NULL), history and
+            # monthly ranges (end_ts order), and the per-user DELETEs in clear_sessions.
+            # Not partial: the DELETEs have no cancelled predicate and could not use it.
+            # apparater and price_cache are already covered by their UNIQUE / PRIMARY KEY indexes.
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_sessions_user_ts
+                ON sessions(user_id, end_ts)
+            """)
     
-    conn.commit()
-    conn.close()
     logger.info(f"Database initialized at {DB_PATH}")
 
 
@@ -97,129 +254,110 @@ def init_database() -> None:
 
 def add_apparat(user_id: int, name: str, low_watt: int, high_watt: int) -> bool:
     """Add a new appliance for a user. Returns True on success, False if exists."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    try:
-        cursor.execute(
-            "INSERT INTO apparater (user_id, name, low_watt, high_watt) VALUES (?, ?, ?, ?)",
-            (user_id, name, low_watt, high_watt)
-        )
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
-    finally:
-        conn.close()
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "INSERT INTO apparater (user_id, name, low_watt, high_watt) VALUES (?, ?, ?, ?)",
+                (user_id, name, low_watt, high_watt)
+            )
+            return True
+        except sqlite3.IntegrityError:
+            return False
 
 
 def get_apparat(user_id: int, name: str) -> Optional[dict]:
     """Get an appliance by name for a user."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT * FROM apparater WHERE user_id = ? AND name = ? COLLATE NOCASE",
-        (user_id, name)
-    )
-    row = cursor.fetchone()
-    conn.close()
-    return dict(row) if row else None
+    with get_conn() as conn:
+        row = conn.execute(
+            "SELECT * FROM apparater WHERE user_id = ? AND name = ? COLLATE NOCASE",
+            (user_id, name)
+        ).fetchone()
+        return dict(row) if row else None
 
 
-def get_all_apparater(user_id: int) -> list[dict]:
+def get_all_apparater(user_id: int) -> list[sqlite3.Row]:
     """Get all appliances for a user."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT * FROM apparater WHERE user_id = ? ORDER BY name",
-        (user_id,)
-    )
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    with get_conn() as conn:
+        return conn.execute(
+            "SELECT * FROM apparater WHERE user_id = ? ORDER BY name",
+            (user_id,)
+        ).fetchall()
 
 
 def delete_apparat(user_id: int, name: str) -> bool:
     """Delete an appliance. Returns True if deleted, False if not found."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "DELETE FROM apparater WHERE user_id = ? AND name = ? COLLATE NOCASE",
-        (user_id, name)
-    )
-    deleted = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-    return deleted
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "DELETE FROM apparater WHERE user_id = ? AND name = ? COLLATE NOCASE",
+            (user_id, name)
+        )
+        deleted = cursor.rowcount > 0
+        return deleted
 
 
 # ============ Session Operations ============
 
-def start_session(user_id: int, apparat_id: int, watt_mode: str, actual_watt: int) -> int:
-    """Start a new tracking session. Returns the session ID."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        """INSERT INTO sessions (user_id, apparat_id, start_time, watt_mode, actual_watt)
-           VALUES (?, ?, ?, ?, ?)""",
-        (user_id, apparat_id, datetime.now(NORWAY_TZ).isoformat(), watt_mode, actual_watt)
-    )
-    session_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
-    return session_id
+def start_session(
+    user_id: int, apparat_id: int, apparat_name: str, watt_mode: str, actual_watt: int
+) -> tuple[int, datetime]:
+    """Start a new tracking session. Returns the session ID and the start time stored on it."""
+    now = datetime.now(NORWAY_TZ)
+    
+    with get_conn() as conn:
+        rows = conn.execute(
+            """INSERT INTO sessions (user_id, apparat_id, apparat_name, start_time, start_ts, watt_mode, actual_watt)
+               VALUES (?, ?, ?, ?, ?, ?, ?)
+               RETURNING id""",
+            (user_id, apparat_id, apparat_name, now.isoformat(), int(now.timestamp()), watt_mode, actual_watt)
+        ).fetchall()  # fetchall, not fetchone: the INSERT must run to completion to autocommit
+        return rows[0]["id"], now
 
 
 def get_active_session(user_id: int) -> Optional[dict]:
     """Get the active (non-ended) session for a user."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        """SELECT s.*, a.name as apparat_name, a.low_watt, a.high_watt
-           FROM sessions s
-           JOIN apparater a ON s.apparat_id = a.id
-           WHERE s.user_id = ? AND s.end_time IS NULL AND s.cancelled = FALSE""",
-        (user_id,)
-    )
-    row = cursor.fetchone()
-    conn.close()
-    return dict(row) if row else None
+    with get_conn() as conn:
+        row = conn.execute(
+            """SELECT * FROM sessions
+               WHERE user_id = ? AND end_ts IS NULL AND cancelled = FALSE""",
+            (user_id,)
+        ).fetchone()
+        return dict(row) if row else None
 
 
 def end_session(session_id: int, kwh: float, spot_cost: float, fixed_cost: float, total_cost: float) -> None:
     """End a session with calculated costs."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        """UPDATE sessions 
-           SET end_time = ?, kwh = ?, spot_cost_nok = ?, fixed_cost_nok = ?, total_cost_nok = ?
-           WHERE id = ?""",
-        (datetime.now(NORWAY_TZ).isoformat(), kwh, spot_cost, fixed_cost, total_cost, session_id)
-    )
-    conn.commit()
-    conn.close()
+    now = datetime.now(NORWAY_TZ)
+    
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            """UPDATE sessions 
+               SET end_time = ?, end_ts = ?, kwh = ?, spot_cost_nok = ?, fixed_cost_nok = ?, total_cost_nok = ?
+               WHERE id = ?""",
+            (now.isoformat(), int(now.timestamp()), kwh, spot_cost, fixed_cost, total_cost, session_id)
+        )
 
 
 def cancel_session(session_id: int) -> None:
     """Cancel an active session without recording costs."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "UPDATE sessions SET cancelled = TRUE, end_time = ? WHERE id = ?",
-        (datetime.now(NORWAY_TZ).isoformat(), session_id)
-    )
-    conn.commit()
-    conn.close()
+    now = datetime.now(NORWAY_TZ)
+    
+    with get_conn() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE sessions SET cancelled = TRUE, end_time = ?, end_ts = ? WHERE id = ?",
+            (now.isoformat(), int(now.timestamp()), session_id)
+        )
 
 
-def get_monthly_sessions(user_id: int, year: int, month: int, period_start_day: int = 1) -> list[dict]:
-    """Get all completed sessions for a billing period."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    # Calculate period start and end dates
-    from datetime import date
-    from calendar import monthrange
-    
+@lru_cache(maxsize=64)
+def _billing_period(year: int, month: int, period_start_day: int = 1) -> tuple[int, int]:
+    """
+    Get the [start, end) unix-second bounds of a billing period.
+    Days start at Norwegian midnight; `start <= end_ts < end` can use the (user_id, end_ts) index.
+    """
     if period_start_day == 1:
         # Standard calendar month
         start_date = date(year, month, 1)
@@ -234,38 +372,80 @@ def get_monthly_sessions(user_id: int, year: int, month: int, period_start_day:
         start_date = date(prev_year, prev_month, period_start_day)
         end_date = date(year, month, period_start_day - 1) if period_start_day > 1 else date(year, month, monthrange(year, month)[1])
     
-    cursor.execute(
-        """SELECT s.*, a.name as apparat_name
-           FROM sessions s
-           JOIN apparater a ON s.apparat_id = a.id
-           WHERE s.user_id = ? 
-           AND s.end_time IS NOT NULL 
-           AND s.cancelled = FALSE
-           AND date(s.end_time) BETWEEN ? AND ?
-           ORDER BY s.end_time DESC""",
-        (user_id, start_date.isoformat(), end_date.isoformat())
+    end_date += timedelta(days=1)
+    return (
+        int(datetime(start_date.year, start_date.month, start_date.day, tzinfo=NORWAY_TZ).timestamp()),
+        int(datetime(end_date.year, end_date.month, end_date.day, tzinfo=NORWAY_TZ).timestamp()),
     )
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
 
 
-def get_session_history(user_id: int, limit: int = 10) -> list[dict]:
+# Completed sessions of one user in a [start, end) billing period. Shared by
+# get_monthly_sessions and get_monthly_totals so the two always select the same rows.
+_BILLING_PERIOD_WHERE = """user_id = ?
+               AND end_ts IS NOT NULL
+               AND cancelled = FALSE
+               AND end_ts >= ? AND end_ts < ?"""
+
+
+def get_monthly_sessions(user_id: int, year: int, month: int, period_start_day: int = 1) -> list[sqlite3.Row]:
+    """
+    Get all completed sessions for a billing period, newest first.
+    Returned as a list so the pooled connection is released before the caller sees any rows.
+    """
+    start_ts, end_ts = _billing_period(year, month, period_start_day)
+    
+    with get_conn() as conn:
+        return conn.execute(
+            f"""SELECT * FROM sessions
+               WHERE {_BILLING_PERIOD_WHERE}
+               ORDER BY end_ts DESC""",
+            (user_id, start_ts, end_ts)
+        ).fetchall()
+
+
+def get_monthly_totals(
+    user_id: int, year: int, month: int, period_start_day: int = 1
+) -> tuple[float, float, float, float, int]:
+    """
+    Get (total_cost, total_kwh, total_spot, total_fixed, count) for a billing period.
+    Same sessions as get_monthly_sessions, summed in SQL.
+    """
+    start_ts, end_ts = _billing_period(year, month, period_start_day)
+    
+    with get_conn() as conn:
+        row = conn.execute(
+            f"""SELECT COALESCE(SUM(total_cost_nok), 0), COALESCE(SUM(kwh), 0),
+                      COALESCE(SUM(spot_cost_nok), 0), COALESCE(SUM(fixed_cost_nok), 0),
+                      COUNT(*)
+               FROM sessions
+               WHERE {_BILLING_PERIOD_WHERE}""",
+            (user_id, start_ts, end_ts)
+        ).fetchone()
+        return tuple(row)
+
+
+def get_session_history(user_id: int, limit: int = 10) -> list[sqlite3.Row]:
     """Get recent session history for a user."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        """SELECT s.*, a.name as apparat_name
-           FROM sessions s
-           JOIN apparater a ON s.apparat_id = a.id
-           WHERE s.user_id = ? AND s.end_time IS NOT NULL AND s.cancelled = FALSE
-           ORDER BY s.end_time DESC
-           LIMIT ?""",
-        (user_id, limit)
-    )
-    rows = cursor.fetchall()
-    conn.close()
-    return [dict(row) for row in rows]
+    with get_conn() as conn:
+        return conn.execute(
+            """SELECT * FROM sessions
+               WHERE user_id = ? AND end_ts IS NOT NULL AND cancelled = FALSE
+               ORDER BY end_ts DESC
+               LIMIT ?""",
+            (user_id, limit)
+        ).fetchall()
+
+
+def get_session_totals(user_id: int) -> tuple[int, float, float]:
+    """Get (count, total kWh, total cost) over all completed sessions for a user."""
+    with get_conn() as conn:
+        count, total_kwh, total_cost = conn.execute(
+            """SELECT COUNT(*), COALESCE(SUM(kwh), 0), COALESCE(SUM(total_cost_nok), 0)
+               FROM sessions
+               WHERE user_id = ? AND end_ts IS NOT NULL AND cancelled = FALSE""",
+            (user_id,)
+        ).fetchone()
+        return count, total_kwh, total_cost
 
 
 def clear_sessions(user_id: int, month: Optional[int] = None, year: Optional[int] = None) -> int:
@@ -274,104 +454,128 @@ def clear_sessions(user_id: int, month: Optional[int] = None, year: Optional[int
     If month/year provided, clear only that month. Otherwise clear all.
     Returns number of sessions deleted.
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    if month and year:
-        # Clear specific month
-        from datetime import date
-        from calendar import monthrange
-        start_date = date(year, month, 1)
-        _, last_day = monthrange(year, month)
-        end_date = date(year, month, last_day)
+    with get_conn() as conn:
+        cursor = conn.cursor()
         
-        cursor.execute(
-            """DELETE FROM sessions 
-               WHERE user_id = ? AND date(end_time) BETWEEN ? AND ?""",
-            (user_id, start_date.isoformat(), end_date.isoformat())
-        )
-    else:
-        # Clear all sessions
-        cursor.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
-    
-    deleted = cursor.rowcount
-    conn.commit()
-    conn.close()
-    return deleted
+        if month and year:
+            # Clear specific month
+            start_ts, end_ts = _billing_period(year, month)
+            
+            cursor.execute(
+                """DELETE FROM sessions 
+                   WHERE user_id = ? AND end_ts >= ? AND end_ts < ?""",
+                (user_id, start_ts, end_ts)
+            )
+        else:
+            # Clear all sessions
+            cursor.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+        
+        deleted = cursor.rowcount
+        return deleted
 
 
 # ============ User Settings Operations ============
 
-def get_user_settings(user_id: int) -> dict:
-    """Get or create user settings."""
-    conn = get_connection()
+# Columns update_user_setting may write (also guards the column names it interpolates)
+_SETTINGS_COLUMNS = frozenset({"fixed_cost_nok", "budget_nok", "period_start_day", "region", "max_duration_hours"})
+
+def _read_user_settings(conn: sqlite3.Connection, user_id: int) -> UserSettings:
+    """Get or create user settings on a connection the caller already holds."""
     cursor = conn.cursor()
     cursor.execute("SELECT * FROM user_settings WHERE user_id = ?", (user_id,))
     row = cursor.fetchone()
     
     if not row:
-        # Create default settings
+        # Create default settings and read them back in one statement. DO UPDATE
+        # (not DO NOTHING) so a row created concurrently is still returned.
         cursor.execute(
-            "INSERT INTO user_settings (user_id) VALUES (?)",
+            """INSERT INTO user_settings (user_id) VALUES (?)
+               ON CONFLICT(user_id) DO UPDATE SET user_id = excluded.user_id
+               RETURNING *""",
             (user_id,)
         )
-        conn.commit()
-        cursor.execute("SELECT * FROM user_settings WHERE user_id = ?", (user_id,))
-        row = cursor.fetchone()
+        # Step the statement to completion so its autocommit finishes before the
+        # connection goes back to the pool
+        row = cursor.fetchall()[0]
     
-    conn.close()
-    return dict(row)
+    return UserSettings(
+        user_id=row["user_id"],
+        fixed_cost_nok=row["fixed_cost_nok"],
+        budget_nok=row["budget_nok"],
+        period_start_day=row["period_start_day"],
+        region=row["region"],
+        max_duration_hours=row["max_duration_hours"],
+    )
 
 
-def update_user_setting(user_id: int, **kwargs) -> None:
-    """Update user settings. Pass any settings as keyword arguments."""
-    # Ensure user exists
-    get_user_settings(user_id)
-    
-    conn = get_connection()
-    cursor = conn.cursor()
+def get_user_settings(user_id: int) -> UserSettings:
+    """Get or create user settings."""
+    with get_conn() as conn:
+        return _read_user_settings(conn, user_id)
+
+
+def get_user_settings_and_appliances(user_id: int) -> tuple[UserSettings, list[sqlite3.Row]]:
+    """Get user settings and all appliances for a user on one pooled connection."""
+    with get_conn() as conn:
+        settings = _read_user_settings(conn, user_id)
+        apparater = conn.execute(
+            "SELECT * FROM apparater WHERE user_id = ? ORDER BY name",
+            (user_id,)
+        ).fetchall()
+        return settings, apparater
+
+
+@lru_cache(maxsize=None)
+def _settings_upsert_sql(keys: tuple[str, ...]) -> str:
+    """
+    Build the upsert for a set of settings columns, once per distinct key tuple.
+    Only called with names from _SETTINGS_COLUMNS, so the result is bounded.
+    """
+    if not keys:
+        return "INSERT INTO user_settings (user_id) VALUES (?) ON CONFLICT(user_id) DO NOTHING"
     
-    for key, value in kwargs.items():
-        if key in ('fixed_cost_nok', 'budget_nok', 'period_start_day', 'region', 'max_duration_hours'):
-            cursor.execute(
-                f"UPDATE user_settings SET {key} = ? WHERE user_id = ?",
-                (value, user_id)
-            )
+    columns = ", ".join(keys)
+    placeholders = ", ".join("?" for _ in keys)
+    assignments = ", ".join(f"{key} = excluded.{key}" for key in keys)
+    return f"""INSERT INTO user_settings (user_id, {columns}) VALUES (?, {placeholders})
+               ON CONFLICT(user_id) DO UPDATE SET {assignments}"""
+
+
+def update_user_setting(user_id: int, **kwargs) -> None:
+    """
+    Update user settings. Pass any settings as keyword arguments.
+    Creates the settings row if needed; all given keys are written in one statement.
+    """
+    keys = tuple(key for key in kwargs if key in _SETTINGS_COLUMNS)
+    values = [kwargs[key] for key in keys]
     
-    conn.commit()
-    conn.close()
+    with get_conn() as conn:
+        conn.execute(_settings_upsert_sql(keys), (user_id, *values))
 
 
 # ============ Price Cache Operations ============
 
+
 def cache_prices(date: str, region: str, prices: list[tuple[int, float]]) -> None:
     """Cache hourly prices for a date and region."""
-    conn = get_connection()
-    cursor = conn.cursor()
+    now = datetime.now().isoformat()
     
-    for hour, price in prices:
-        cursor.execute(
+    # One transaction (one commit) for the whole day
+    with get_conn() as conn, txn(conn):
+        conn.executemany(
             """INSERT OR REPLACE INTO price_cache (date, region, hour, price_nok, cached_at)
                VALUES (?, ?, ?, ?, ?)""",
-            (date, region, hour, price, datetime.now().isoformat())
+            [(date, region, hour, price, now) for hour, price in prices]
         )
-    
-    conn.commit()
-    conn.close()
 
 
 def get_cached_prices(date: str, region: str) -> Optional[dict[int, float]]:
     """Get cached prices for a date and region. Returns dict of hour -> price."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT hour, price_nok FROM price_cache WHERE date = ? AND region = ?",
-        (date, region)
-    )
-    rows = cursor.fetchall()
-    conn.close()
-    
-    if not rows:
-        return None
+    with get_conn() as conn:
+        rows = conn.execute(
+            "SELECT hour, price_nok FROM price_cache WHERE date = ? AND region = ? ORDER BY hour",
+            (date, region)
+        )
+        prices = {hour: price for hour, price in rows}
     
-    return {row['hour']: row['price_nok'] for row in rows}
+    return prices or None
@@ -0,0 +1,52 @@
+"""
+Short-lived in-memory cache for user settings.
+Settings change rarely, so reads on hot paths (alerts, handlers) are served
+from memory and the row is only re-read after SETTINGS_TTL seconds or an update.
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+from database.models import UserSettings, get_user_settings
+
+# Seconds a user's settings row is served from memory before re-reading it
+SETTINGS_TTL = 30.0
+
+# user_id -> (fetched_at, settings)
+_cache: dict[int, tuple[float, UserSettings]] = {}
+
+
+def _lookup(user_id: int) -> Optional[UserSettings]:
+    """Return cached settings if still fresh, None otherwise."""
+    entry = _cache.get(user_id)
+    if entry and time.monotonic() - entry[0] < SETTINGS_TTL:
+        return entry[1]
+    return None
+
+
+def prime_user_settings(user_id: int, settings: UserSettings) -> None:
+    """Store settings that were read through another query."""
+    _cache[user_id] = (time.monotonic(), settings)
+
+
+def get_user_settings_cached(user_id: int) -> UserSettings:
+    """Get user settings, reading the database only on a miss or after the TTL."""
+    settings = _lookup(user_id)
+    if settings is None:
+        settings = get_user_settings(user_id)
+        prime_user_settings(user_id, settings)
+    return settings
+
+
+async def aget_user_settings_cached(user_id: int) -> UserSettings:
+    """Async variant: answers hits directly and only uses a worker thread on a miss."""
+    settings = _lookup(user_id)
+    if settings is None:
+        settings = await asyncio.to_thread(get_user_settings_cached, user_id)
+    return settings
+
+
+def invalidate_user_settings(user_id: int) -> None:
+    """Drop a user's cached settings (call after any settings update)."""
+    _cache.pop(user_id, None)
@@ -17,6 +17,7 @@ from telegram.ext import Application
 
 from database.models import init_database
 from bot.handlers import setup_handlers, set_commands
+from core.price_api import close_session
 
 
 # Configure logging
@@ -56,6 +57,12 @@ async def post_init(application: Application) -> None:
     logger.info("Bot commands registered")
 
 
+async def post_shutdown(application: Application) -> None:
+    """Post-shutdown hook - close the shared HTTP session."""
+    await close_session()
+    logger.info("HTTP session closed")
+
+
 def main() -> None:
     """Start the bot."""
     logger.info("=" * 50)
@@ -75,6 +82,7 @@ def main() -> None:
         Application.builder()
         .token(config["token"])
         .post_init(post_init)
+        .post_shutdown(post_shutdown)
         .build()
     )
     
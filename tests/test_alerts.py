@@ -0,0 +1,146 @@
+"""
+Unit tests for the alert rules and the monthly totals cache.
+"""
+
+import asyncio
+import pytest
+import time
+
+import core.alerts as alerts
+from database.models import UserSettings
+
+
+def make_settings(budget_nok=None, max_duration_hours=0) -> UserSettings:
+    """Settings for user 123 with the given budget and max duration."""
+    return UserSettings(
+        user_id=123,
+        fixed_cost_nok=1.0,
+        budget_nok=budget_nok,
+        period_start_day=1,
+        region="NO1",
+        max_duration_hours=max_duration_hours,
+    )
+
+
+def make_session(hours: float) -> dict:
+    """An active session that started the given number of hours ago."""
+    return {"id": 1, "apparat_name": "Heater", "start_ts": time.time() - hours * 3600}
+
+
+@pytest.fixture(autouse=True)
+def monthly_totals(monkeypatch):
+    """Empty monthly cache and a stubbed totals query; returns the list of calls."""
+    calls = []
+    totals = {"cost": 0.0}
+    
+    def fake_totals(user_id, year, month, period_start_day):
+        calls.append(user_id)
+        return (totals["cost"], 0.0, 0.0, 0.0, 1)
+    
+    def no_db(user_id):
+        raise AssertionError("active session should not be read from the database")
+    
+    monkeypatch.setattr(alerts, "_monthly_cache", {})
+    monkeypatch.setattr(alerts, "get_monthly_totals", fake_totals)
+    monkeypatch.setattr(alerts, "get_active_session", no_db)
+    return calls, totals
+
+
+class TestCheckAllAlerts:
+    """Tests for the merged budget, runtime and max duration rules."""
+    
+    def test_no_alerts(self, monthly_totals):
+        """Test a short session under budget triggers nothing."""
+        _, totals = monthly_totals
+        totals["cost"] = 10.0
+        
+        result = asyncio.run(alerts.check_all_alerts(123, make_session(0.5), make_settings(budget_nok=100)))
+        assert result == []
+    
+    def test_budget_warning(self, monthly_totals):
+        """Test 80% of the budget triggers a warning."""
+        _, totals = monthly_totals
+        totals["cost"] = 85.0
+        
+        result = asyncio.run(alerts.check_all_alerts(123, make_session(0.5), make_settings(budget_nok=100)))
+        assert len(result) == 1
+        assert "Budget warning" in result[0]
+        assert "15.00 kr remaining" in result[0]
+    
+    def test_budget_exceeded(self, monthly_totals):
+        """Test spending past the budget triggers the exceeded alert."""
+        _, totals = monthly_totals
+        totals["cost"] = 120.0
+        
+        result = asyncio.run(alerts.check_all_alerts(123, make_session(0.5), make_settings(budget_nok=100)))
+        assert len(result) == 1
+        assert "Budget exceeded" in result[0]
+    
+    def test_budget_skipped_when_excluded(self, monthly_totals):
+        """Test include_budget=False leaves out the budget rule without reading totals."""
+        calls, totals = monthly_totals
+        totals["cost"] = 120.0
+        
+        result = asyncio.run(alerts.check_all_alerts(
+            123, make_session(0.5), make_settings(budget_nok=100), include_budget=False
+        ))
+        assert result == []
+        assert calls == []
+    
+    def test_explicit_no_session_skips_lookup(self, monthly_totals):
+        """Test session=None is taken as 'no active session' rather than looked up."""
+        result = asyncio.run(alerts.check_all_alerts(123, None, make_settings(max_duration_hours=2)))
+        assert result == []
+    
+    def test_runtime_and_max_duration(self, monthly_totals):
+        """Test a 3 hour session triggers both the runtime and max duration alerts."""
+        result = asyncio.run(alerts.check_all_alerts(123, make_session(3), make_settings(max_duration_hours=2)))
+        assert len(result) == 2
+        assert "Long session" in result[0]
+        assert "Heater" in result[0]
+        assert "Max duration reached" in result[1]
+        assert "limit: 2h" in result[1]
+    
+    def test_max_duration_disabled(self, monthly_totals):
+        """Test max duration 0 only leaves the runtime alert."""
+        result = asyncio.run(alerts.check_all_alerts(123, make_session(3), make_settings()))
+        assert len(result) == 1
+        assert "Long session" in result[0]
+
+
+class TestMonthlyCache:
+    """Tests for the cached monthly totals."""
+    
+    def test_totals_cached_until_invalidated(self, monthly_totals):
+        """Test repeat reads hit the cache and invalidation forces a fresh total."""
+        calls, totals = monthly_totals
+        totals["cost"] = 10.0
+        
+        assert alerts._get_monthly_totals(123, 2024, 1, 1)[0] == 10.0
+        totals["cost"] = 25.0
+        assert alerts._get_monthly_totals(123, 2024, 1, 1)[0] == 10.0
+        assert len(calls) == 1
+        
+        alerts.invalidate_monthly_cache(123)
+        
+        assert alerts._get_monthly_totals(123, 2024, 1, 1)[0] == 25.0
+        assert len(calls) == 2
+    
+    def test_invalidate_only_touches_user(self, monthly_totals):
+        """Test invalidating one user keeps other users' cached totals."""
+        calls, _ = monthly_totals
+        alerts._get_monthly_totals(123, 2024, 1, 1)
+        alerts._get_monthly_totals(456, 2024, 1, 1)
+        
+        alerts.invalidate_monthly_cache(123)
+        alerts._get_monthly_totals(456, 2024, 1, 1)
+        
+        assert calls == [123, 456]
+    
+    def test_expired_entries_pruned(self, monthly_totals, monkeypatch):
+        """Test expired entries are dropped when a new total is stored."""
+        alerts._get_monthly_totals(123, 2024, 1, 1)
+        monkeypatch.setattr(alerts, "MONTHLY_TTL", 0.0)
+        alerts._get_monthly_totals(456, 2024, 1, 1)
+        
+        assert list(alerts._monthly_cache) == [(456, 2024, 1, 1)]
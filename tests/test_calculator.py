@@ -2,10 +2,12 @@
 Unit tests for the cost calculator module.
 """
 
+import asyncio
 import pytest
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
+import core.calculator as calculator
 from core.calculator import calculate_watt, format_duration
 
 
@@ -103,3 +105,71 @@ class TestCostCalculation:
         price_with_mva = raw_price * (1 + mva_rate)
         
         assert round(price_with_mva, 2) == 1.85
+
+
+class TestCalculateSessionCost:
+    """Tests for hour-by-hour session cost with stubbed prices."""
+    
+    @pytest.fixture(autouse=True)
+    def fixed_prices(self, monkeypatch):
+        """Serve 1.0 NOK/kWh before 13:00 and 2.0 NOK/kWh after."""
+        async def fake_prices(start, end, region="NO1"):
+            hour = start.replace(minute=0, second=0, microsecond=0)
+            prices = []
+            while hour < end:
+                prices.append((hour, 1.0 if hour.hour < 13 else 2.0))
+                hour += timedelta(hours=1)
+            return prices
+        
+        monkeypatch.setattr(calculator, "get_prices_for_period", fake_prices)
+    
+    def test_partial_hours(self):
+        """Test a session spanning two partial hours at different prices."""
+        start = datetime(2024, 1, 15, 12, 30, tzinfo=NORWAY_TZ)
+        end = datetime(2024, 1, 15, 13, 30, tzinfo=NORWAY_TZ)
+        
+        result = asyncio.run(calculator.calculate_session_cost(start, end, 1000, 0.5))
+        
+        assert result.hours == 1.0
+        assert result.kwh == 1.0
+        assert result.spot_cost == 1.5  # 0.5 kWh @ 1.0 + 0.5 kWh @ 2.0
+        assert result.fixed_cost == 0.5
+        assert result.total_cost == 2.0
+        assert result.avg_spot_price == 1.5
+        assert result.hourly_breakdown == []
+    
+    def test_detailed_breakdown(self):
+        """Test that detailed=True returns one entry per hour used."""
+        start = datetime(2024, 1, 15, 12, 30, tzinfo=NORWAY_TZ)
+        end = datetime(2024, 1, 15, 13, 30, tzinfo=NORWAY_TZ)
+        
+        result = asyncio.run(
+            calculator.calculate_session_cost(start, end, 1000, 0.5, detailed=True)
+        )
+        
+        breakdown = result.hourly_breakdown
+        assert [h["hour"] for h in breakdown] == ["12:00", "13:00"]
+        assert [h["cost"] for h in breakdown] == [0.5, 1.0]
+    
+    def test_autumn_dst_session_counts_real_hours(self, monkeypatch):
+        """Test a session across the repeated 02:00 is billed for its real elapsed time."""
+        async def utc_hours(start, end, region="NO1"):
+            first = datetime(2024, 10, 26, 23, 0, tzinfo=timezone.utc)
+            return [((first + timedelta(hours=i)).astimezone(NORWAY_TZ), 1.0) for i in range(4)]
+        
+        monkeypatch.setattr(calculator, "get_prices_for_period", utc_hours)
+        start = datetime(2024, 10, 27, 1, 30, tzinfo=NORWAY_TZ)  # 23:30 UTC
+        end = datetime(2024, 10, 27, 3, 30, tzinfo=NORWAY_TZ)    # 02:30 UTC
+        
+        result = asyncio.run(calculator.calculate_session_cost(start, end, 1000, 0.5))
+        
+        assert result.hours == 3.0
+        assert result.kwh == 3.0
+    
+    def test_zero_duration(self):
+        """Test that a zero-length session costs nothing."""
+        start = datetime(2024, 1, 15, 12, 0, tzinfo=NORWAY_TZ)
+        
+        result = asyncio.run(calculator.calculate_session_cost(start, start, 1000, 0.5))
+        
+        assert result.total_cost == 0
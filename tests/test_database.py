@@ -3,36 +3,37 @@ Tests for database operations.
 """
 
 import pytest
-import os
-import tempfile
-from datetime import datetime
+import time
 
 # Override DB path before importing models
 import database.models as models
 
+# Shared-cache in-memory database: every pooled connection sees the same tables
+TEST_DB_PATH = "file::memory:?cache=shared"
+
 
 @pytest.fixture(autouse=True)
 def temp_database():
-    """Use a temporary database for each test."""
-    # Create temp file
-    fd, path = tempfile.mkstemp(suffix=".db")
-    os.close(fd)
-    
+    """Use a fresh in-memory database for each test."""
     # Override the DB path
     original_path = models.DB_PATH
-    models.DB_PATH = path
+    models.DB_PATH = TEST_DB_PATH
     
-    # Initialize the database
+    # Drop whatever the previous test left behind, then recreate the schema
+    with models.get_conn() as conn:
+        tables = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+        ).fetchall()
+        for (name,) in tables:
+            conn.execute(f"DROP TABLE {name}")
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+            conn.execute("DELETE FROM sqlite_sequence")
     models.init_database()
     
-    yield path
+    yield TEST_DB_PATH
     
     # Cleanup
     models.DB_PATH = original_path
-    try:
-        os.unlink(path)
-    except:
-        pass
 
 
 class TestApparatOperations:
@@ -111,21 +112,38 @@ class TestSessionOperations:
         models.add_apparat(123, "Heater", 750, 1500)
         apparat = models.get_apparat(123, "Heater")
         
-        session_id = models.start_session(123, apparat["id"], "avg", 1125)
+        session_id, started = models.start_session(123, apparat["id"], "Heater", "avg", 1125)
         assert session_id is not None
         assert session_id > 0
+        
+        # The returned start time is exactly what was stored
+        session = models.get_active_session(123)
+        assert session["start_time"] == started.isoformat()
+        assert session["start_ts"] == int(started.timestamp())
     
     def test_get_active_session(self):
         """Test retrieving active session."""
         models.add_apparat(123, "Heater", 750, 1500)
         apparat = models.get_apparat(123, "Heater")
-        models.start_session(123, apparat["id"], "high", 1500)
+        models.start_session(123, apparat["id"], "Heater", "high", 1500)
         
         session = models.get_active_session(123)
         assert session is not None
         assert session["watt_mode"] == "high"
         assert session["actual_watt"] == 1500
         assert session["apparat_name"] == "Heater"
+        assert abs(session["start_ts"] - time.time()) < 60
+    
+    def test_session_keeps_name_of_deleted_apparat(self):
+        """Test a session still shows its appliance name after the appliance is deleted."""
+        models.add_apparat(123, "Heater", 750, 1500)
+        apparat = models.get_apparat(123, "Heater")
+        session_id, _ = models.start_session(123, apparat["id"], apparat["name"], "avg", 1125)
+        models.delete_apparat(123, "Heater")
+        models.end_session(session_id, 1.0, 1.0, 1.0, 2.0)
+        
+        history = models.get_session_history(123)
+        assert [s["apparat_name"] for s in history] == ["Heater"]
     
     def test_no_active_session(self):
         """Test no active session returns None."""
@@ -136,7 +154,7 @@ class TestSessionOperations:
         """Test ending a session."""
         models.add_apparat(123, "Heater", 750, 1500)
         apparat = models.get_apparat(123, "Heater")
-        session_id = models.start_session(123, apparat["id"], "avg", 1125)
+        session_id, _ = models.start_session(123, apparat["id"], "Heater", "avg", 1125)
         
         models.end_session(session_id, 2.25, 2.72, 4.05, 6.77)
         
@@ -148,13 +166,108 @@ class TestSessionOperations:
         """Test cancelling a session."""
         models.add_apparat(123, "Heater", 750, 1500)
         apparat = models.get_apparat(123, "Heater")
-        session_id = models.start_session(123, apparat["id"], "avg", 1125)
+        session_id, _ = models.start_session(123, apparat["id"], "Heater", "avg", 1125)
         
         models.cancel_session(session_id)
         
         # No longer active
         session = models.get_active_session(123)
         assert session is None
+    
+    def test_get_session_totals(self):
+        """Test totals only count completed, non-cancelled sessions."""
+        models.add_apparat(123, "Heater", 750, 1500)
+        apparat = models.get_apparat(123, "Heater")
+        
+        first, _ = models.start_session(123, apparat["id"], "Heater", "avg", 1125)
+        models.end_session(first, 2.0, 2.5, 2.0, 4.5)
+        second, _ = models.start_session(123, apparat["id"], "Heater", "avg", 1125)
+        models.end_session(second, 1.0, 1.0, 1.0, 2.0)
+        cancelled, _ = models.start_session(123, apparat["id"], "Heater", "avg", 1125)
+        models.cancel_session(cancelled)
+        
+        count, total_kwh, total_cost = models.get_session_totals(123)
+        assert count == 2
+        assert total_kwh == 3.0
+        assert total_cost == 6.5
+    
+    def test_get_session_totals_empty(self):
+        """Test totals for a user without sessions."""
+        assert models.get_session_totals(123) == (0, 0, 0)
+    
+    def test_get_monthly_totals_matches_sessions(self):
+        """Test SQL monthly totals agree with the monthly session rows."""
+        models.add_apparat(123, "Heater", 750, 1500)
+        apparat = models.get_apparat(123, "Heater")
+        
+        first, _ = models.start_session(123, apparat["id"], "Heater", "avg", 1125)
+        models.end_session(first, 2.0, 2.5, 2.0, 4.5)
+        second, _ = models.start_session(123, apparat["id"], "Heater", "avg", 1125)
+        models.end_session(second, 1.0, 1.0, 1.0, 2.0)
+        outside, _ = models.start_session(123, apparat["id"], "Heater", "avg", 1125)
+        models.end_session(outside, 4.0, 4.0, 4.0, 8.0)
+        
+        # Fixed end times: two in February 2024 (Oslo time), one just before it
+        with models.get_conn() as conn:
+            conn.executemany(
+                "UPDATE sessions SET end_ts = ? WHERE id = ?",
+                [(1707000000, first), (1709100000, second), (1706741999, outside)]
+            )
+        
+        sessions = models.get_monthly_sessions(123, 2024, 2)
+        total_cost, total_kwh, total_spot, total_fixed, count = models.get_monthly_totals(123, 2024, 2)
+        
+        assert count == len(sessions) == 2
+        assert total_cost == sum(s["total_cost_nok"] for s in sessions)
+        assert total_kwh == sum(s["kwh"] for s in sessions)
+        assert total_spot == sum(s["spot_cost_nok"] for s in sessions)
+        assert total_fixed == sum(s["fixed_cost_nok"] for s in sessions)
+    
+    def test_monthly_sessions_use_local_dates(self):
+        """Test a session ending just after local midnight counts in the new month."""
+        models.add_apparat(123, "Heater", 750, 1500)
+        apparat = models.get_apparat(123, "Heater")
+        session_id, _ = models.start_session(123, apparat["id"], "Heater", "avg", 1125)
+        models.end_session(session_id, 1.0, 1.0, 1.0, 2.0)
+        
+        with models.get_conn() as conn:
+            conn.execute(
+                "UPDATE sessions SET end_time = ?, end_ts = ? WHERE id = ?",
+                ("2024-02-01T00:30:00+01:00", 1706743800, session_id)
+            )
+        
+        assert len(models.get_monthly_sessions(123, 2024, 2)) == 1
+        assert len(models.get_monthly_sessions(123, 2024, 1)) == 0
+    
+    def test_monthly_sessions_custom_period_start(self):
+        """Test a billing period starting on the 15th runs from Jan 15 up to (not including) Feb 15."""
+        models.add_apparat(123, "Heater", 750, 1500)
+        apparat = models.get_apparat(123, "Heater")
+        ids = []
+        for end_ts in (1705273199, 1705273200, 1707951599, 1707951600):
+            session_id, _ = models.start_session(123, apparat["id"], "Heater", "avg", 1125)
+            models.end_session(session_id, 1.0, 1.0, 1.0, 2.0)
+            with models.get_conn() as conn:
+                conn.execute("UPDATE sessions SET end_ts = ? WHERE id = ?", (end_ts, session_id))
+            ids.append(session_id)
+        
+        sessions = models.get_monthly_sessions(123, 2024, 2, period_start_day=15)
+        assert [s["id"] for s in sessions] == [ids[2], ids[1]]
+        assert models.get_monthly_totals(123, 2024, 2, period_start_day=15)[4] == 2
+    
+    def test_clear_sessions_only_touches_user(self):
+        """Test clearing all sessions leaves other users' sessions alone."""
+        models.add_apparat(123, "Heater", 750, 1500)
+        models.add_apparat(456, "Heater", 750, 1500)
+        for user_id in (123, 456):
+            apparat = models.get_apparat(user_id, "Heater")
+            session_id, _ = models.start_session(user_id, apparat["id"], "Heater", "avg", 1125)
+            models.end_session(session_id, 1.0, 1.0, 1.0, 2.0)
+        
+        assert models.clear_sessions(123) == 1
+        assert models.get_session_totals(123) == (0, 0, 0)
+        assert models.get_session_totals(456)[0] == 1
+
 
 
 class TestUserSettings:
@@ -164,11 +277,11 @@ class TestUserSettings:
         """Test default settings are created."""
         settings = models.get_user_settings(123)
         
-        assert settings["user_id"] == 123
-        assert settings["fixed_cost_nok"] == 1.8
-        assert settings["region"] == "NO1"
-        assert settings["period_start_day"] == 1
-        assert settings["max_duration_hours"] == 0
+        assert settings.user_id == 123
+        assert settings.fixed_cost_nok == 1.0
+        assert settings.region == "NO1"
+        assert settings.period_start_day == 1
+        assert settings.max_duration_hours == 0
     
     def test_update_setting(self):
         """Test updating user settings."""
@@ -177,8 +290,8 @@ class TestUserSettings:
         models.update_user_setting(123, fixed_cost_nok=2.0, region="NO5")
         
         settings = models.get_user_settings(123)
-        assert settings["fixed_cost_nok"] == 2.0
-        assert settings["region"] == "NO5"
+        assert settings.fixed_cost_nok == 2.0
+        assert settings.region == "NO5"
     
     def test_update_budget(self):
         """Test setting budget."""
@@ -186,4 +299,121 @@ class TestUserSettings:
         models.update_user_setting(123, budget_nok=200.0)
         
         settings = models.get_user_settings(123)
-        assert settings["budget_nok"] == 200.0
+        assert settings.budget_nok == 200.0
+    
+    def test_update_ignores_unknown_keys(self):
+        """Test unknown keys are skipped and None clears a setting."""
+        models.update_user_setting(123, budget_nok=200.0)
+        models.update_user_setting(123, budget_nok=None, created_at="x", bogus=1)
+        
+        settings = models.get_user_settings(123)
+        assert settings.user_id == 123
+        assert settings.budget_nok is None
+    
+    def test_get_settings_and_appliances(self):
+        """Test fetching settings and appliances together."""
+        models.add_apparat(123, "Heater", 750, 1500)
+        models.update_user_setting(123, region="NO3")
+        
+        settings, apparater = models.get_user_settings_and_appliances(123)
+        assert settings.region == "NO3"
+        assert [a["name"] for a in apparater] == ["Heater"]
+    
+    def test_cached_settings_until_invalidated(self):
+        """Test cached settings are reused until invalidated."""
+        from database.settings_cache import get_user_settings_cached, invalidate_user_settings
+        
+        invalidate_user_settings(456)
+        assert get_user_settings_cached(456).region == "NO1"
+        
+        models.update_user_setting(456, region="NO4")
+        assert get_user_settings_cached(456).region == "NO1"  # Still cached
+        
+        invalidate_user_settings(456)
+        assert get_user_settings_cached(456).region == "NO4"
+
+
+class TestPriceCache:
+    """Tests for the hourly price cache."""
+    
+    def test_cache_and_read_prices(self):
+        """Test cached prices come back as an hour -> price dict."""
+        models.cache_prices("2024-01-15", "NO1", [(1, 1.5), (0, 1.25)])
+        
+        assert models.get_cached_prices("2024-01-15", "NO1") == {0: 1.25, 1: 1.5}
+        assert models.get_cached_prices("2024-01-15", "NO2") is None
+    
+    def test_cache_replaces_existing_hours(self):
+        """Test re-caching a day overwrites the stored prices."""
+        models.cache_prices("2024-01-15", "NO1", [(0, 1.0)])
+        models.cache_prices("2024-01-15", "NO1", [(0, 2.0)])
+        
+        assert models.get_cached_prices("2024-01-15", "NO1") == {0: 2.0}
+
+
+class TestMigrations:
+    """Tests for schema migrations on existing databases."""
+    
+    def test_backfill_integer_timestamps(self):
+        """Test sessions from before start_ts/end_ts get them filled in."""
+        with models.get_conn() as conn:
+            conn.execute("DROP TABLE sessions")
+            conn.execute("""
+                CREATE TABLE sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id INTEGER NOT NULL,
+                    apparat_id INTEGER NOT NULL,
+                    start_time TIMESTAMP NOT NULL,
+                    end_time TIMESTAMP,
+                    watt_mode TEXT NOT NULL,
+                    actual_watt INTEGER NOT NULL,
+                    kwh REAL,
+                    spot_cost_nok REAL,
+                    fixed_cost_nok REAL,
+                    total_cost_nok REAL,
+                    cancelled BOOLEAN DEFAULT FALSE
+                )
+            """)
+            conn.execute(
+                """INSERT INTO sessions (user_id, apparat_id, start_time, end_time, watt_mode, actual_watt)
+                   VALUES (123, 1, '2024-02-01T00:00:00+01:00', '2024-02-01T00:30:00+01:00', 'avg', 1000)"""
+            )
+        
+        models.init_database()
+        
+        with models.get_conn() as conn:
+            row = conn.execute("SELECT start_ts, end_ts FROM sessions").fetchone()
+        assert (row["start_ts"], row["end_ts"]) == (1706742000, 1706743800)
+    
+    def test_backfill_apparat_name(self):
+        """Test sessions from before apparat_name get the appliance name filled in."""
+        models.add_apparat(123, "Heater", 750, 1500)
+        apparat = models.get_apparat(123, "Heater")
+        with models.get_conn() as conn:
+            conn.execute(
+                """INSERT INTO sessions (user_id, apparat_id, start_time, watt_mode, actual_watt)
+                   VALUES (123, ?, '2024-02-01T00:00:00+01:00', 'avg', 1000)""",
+                (apparat["id"],)
+            )
+            conn.execute("ALTER TABLE sessions DROP COLUMN apparat_name")
+        
+        models.init_database()
+        
+        with models.get_conn() as conn:
+            row = conn.execute("SELECT apparat_name FROM sessions").fetchone()
+        assert row["apparat_name"] == "Heater"
+
+
+class TestConnectionPool:
+    """Tests for the pooled connection helper."""
+    
+    def test_rollback_on_error(self):
+        """Test a transaction is rolled back when the block raises."""
+        with pytest.raises(RuntimeError):
+            with models.get_conn() as conn, models.txn(conn):
+                conn.execute("INSERT INTO user_settings (user_id) VALUES (?)", (999,))
+                raise RuntimeError("boom")
+        
+        with models.get_conn() as conn:
+            row = conn.execute("SELECT COUNT(*) FROM user_settings WHERE user_id = ?", (999,)).fetchone()
+        assert row[0] == 0
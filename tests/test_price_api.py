@@ -0,0 +1,168 @@
+"""
+Unit tests for the spot price fetching and caching layer.
+"""
+
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import core.price_api as price_api
+
+
+NORWAY_TZ = ZoneInfo("Europe/Oslo")
+
+# Hours the API publishes on the DST change days (spring has no 02, autumn has it twice)
+DST_HOURS = {
+    "2024-03-31": [h for h in range(24) if h != 2],
+    "2024-10-27": [0, 1, 2, 2] + list(range(3, 24)),
+}
+
+
+@pytest.fixture
+def downloads(monkeypatch):
+    """Fresh in-memory caches, an empty database cache and a fake API download."""
+    calls = []
+    
+    async def fake_download(date, date_str, region):
+        calls.append(date_str)
+        await asyncio.sleep(0.01)
+        return {h: float(h) for h in DST_HOURS.get(date_str, range(24))}
+    
+    monkeypatch.setattr(price_api, "_mem_cache", {})
+    monkeypatch.setattr(price_api, "_inflight", {})
+    monkeypatch.setattr(price_api, "get_cached_prices", lambda date, region: None)
+    monkeypatch.setattr(price_api, "_download_daily_prices", fake_download)
+    return calls
+
+
+class TestFetchDailyPrices:
+    """Tests for single-flight downloads and the in-process day cache."""
+    
+    def test_concurrent_misses_share_one_download(self, downloads):
+        """Test concurrent requests for the same day issue a single download."""
+        day = datetime(2024, 1, 15, tzinfo=NORWAY_TZ)
+        
+        async def run():
+            return await asyncio.gather(*(price_api.fetch_daily_prices(day, "NO1") for _ in range(5)))
+        
+        results = asyncio.run(run())
+        
+        assert downloads == ["2024-01-15"]
+        assert all(prices == results[0] for prices in results)
+        assert price_api._inflight == {}
+    
+    def test_repeat_read_served_from_memory(self, downloads):
+        """Test a day already fetched is not downloaded again."""
+        day = datetime(2024, 1, 15, tzinfo=NORWAY_TZ)
+        
+        asyncio.run(price_api.fetch_daily_prices(day, "NO1"))
+        asyncio.run(price_api.fetch_daily_prices(day, "NO1"))
+        
+        assert downloads == ["2024-01-15"]
+    
+    def test_oldest_day_evicted_when_full(self, downloads):
+        """Test the memory cache keeps the MEM_CACHE_SIZE most recently added days."""
+        first = datetime(2024, 1, 1, tzinfo=NORWAY_TZ)
+        
+        async def run():
+            for i in range(price_api.MEM_CACHE_SIZE + 1):
+                await price_api.fetch_daily_prices(first + timedelta(days=i), "NO1")
+        
+        asyncio.run(run())
+        
+        assert len(price_api._mem_cache) == price_api.MEM_CACHE_SIZE
+        assert ("2024-01-01", "NO1") not in price_api._mem_cache
+        assert ("2024-01-31", "NO1") in price_api._mem_cache
+    
+    def test_failure_reaches_every_waiter(self, downloads, monkeypatch):
+        """Test a failed download is raised to all joined callers and retried afterwards."""
+        async def failing_download(date, date_str, region):
+            downloads.append(date_str)
+            await asyncio.sleep(0.01)
+            raise RuntimeError("API down")
+        
+        monkeypatch.setattr(price_api, "_download_daily_prices", failing_download)
+        day = datetime(2024, 1, 15, tzinfo=NORWAY_TZ)
+        
+        async def run():
+            return await asyncio.gather(
+                *(price_api.fetch_daily_prices(day, "NO1") for _ in range(3)),
+                return_exceptions=True,
+            )
+        
+        results = asyncio.run(run())
+        
+        assert downloads == ["2024-01-15"]
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert price_api._inflight == {}
+        
+        with pytest.raises(RuntimeError):
+            asyncio.run(price_api.fetch_daily_prices(day, "NO1"))
+        assert len(downloads) == 2
+    
+    def test_cancelled_caller_does_not_cancel_download(self, downloads):
+        """Test cancelling one waiter leaves the shared download running for the others."""
+        day = datetime(2024, 1, 15, tzinfo=NORWAY_TZ)
+        
+        async def run():
+            first = asyncio.create_task(price_api.fetch_daily_prices(day, "NO1"))
+            second = asyncio.create_task(price_api.fetch_daily_prices(day, "NO1"))
+            await asyncio.sleep(0)
+            first.cancel()
+            return await second
+        
+        prices = asyncio.run(run())
+        
+        assert downloads == ["2024-01-15"]
+        assert prices[12] == 12.0
+
+
+class TestGetPricesForPeriod:
+    """Tests for splitting a period into days and hours."""
+    
+    def test_end_at_midnight_skips_next_day(self, downloads):
+        """Test a period ending exactly at midnight does not fetch the following day."""
+        start = datetime(2024, 1, 15, 22, 30, tzinfo=NORWAY_TZ)
+        end = datetime(2024, 1, 16, 0, 0, tzinfo=NORWAY_TZ)
+        
+        prices = asyncio.run(price_api.get_prices_for_period(start, end, "NO1"))
+        
+        assert downloads == ["2024-01-15"]
+        assert [(hour.hour, price) for hour, price in prices] == [(22, 22.0), (23, 23.0)]
+    
+    def test_period_across_days_fetches_each_day_once(self, downloads):
+        """Test a multi-day period fetches every day it touches exactly once."""
+        start = datetime(2024, 1, 15, 23, 0, tzinfo=NORWAY_TZ)
+        end = datetime(2024, 1, 17, 1, 0, tzinfo=NORWAY_TZ)
+        
+        prices = asyncio.run(price_api.get_prices_for_period(start, end, "NO1"))
+        
+        assert sorted(downloads) == ["2024-01-15", "2024-01-16", "2024-01-17"]
+        assert len(prices) == 26
+    
+    def test_spring_dst_day_has_23_hours(self, downloads):
+        """Test the day clocks go forward yields 23 hours with no 02:00."""
+        start = datetime(2024, 3, 31, 0, 0, tzinfo=NORWAY_TZ)
+        end = datetime(2024, 4, 1, 0, 0, tzinfo=NORWAY_TZ)
+        
+        prices = asyncio.run(price_api.get_prices_for_period(start, end, "NO1"))
+        
+        assert downloads == ["2024-03-31"]
+        hours = [hour.hour for hour, _ in prices]
+        assert len(hours) == 23
+        assert 2 not in hours
+        assert hours == sorted(hours)
+    
+    def test_autumn_dst_day_covers_both_02_hours(self, downloads):
+        """Test the day clocks go back yields 25 hours; both 02:00 hours share the one stored price."""
+        start = datetime(2024, 10, 27, 0, 0, tzinfo=NORWAY_TZ)
+        end = datetime(2024, 10, 28, 0, 0, tzinfo=NORWAY_TZ)
+        
+        prices = asyncio.run(price_api.get_prices_for_period(start, end, "NO1"))
+        
+        assert downloads == ["2024-10-27"]
+        assert len(prices) == 25
+        instants = [hour.timestamp() for hour, _ in prices]
+        assert all(b - a == 3600 for a, b in zip(instants, instants[1:]))
+        assert [price for hour, price in prices if hour.hour == 2] == [2.0, 2.0]